@@ -1,21 +1,34 @@
 # the main parser for parsing path information
 # and generating error specifications
-from parser_utils import OutputParser
-from value_parser import parse_value, \
+from parser_utils import OutputParser, MappedLines, batch_lines
+from columnar_log import ColumnarLog
+from value_parser import parse_value, parse_symbol, value_caches, \
 			 BOOL_TYPE_START, PTR_TYPE_START, INT_TYPE_START, \
 			 VOID_TYPE_START, reparse_value, is_undefined
 from ranges import RangeNode, RangeList, generate_smooth
 from value_stats import initialize_stat, initialize_raw_stat, \
 			BooleanStat, PointerStat, IntegerStat, to_label
-from print_sorted_keys import sort_by_key, sorted_keys_string
+from print_sorted_keys import sort_by_key
 from spec import ERROR_SPEC_PREFIX, INFALLIBLE_MARKER
 
 from vote import ExtremeVote
+from seen_paths import SEEN_KEYS, init_seen_paths
+from deferred_sites import DeferredSites, DEFAULT_MAX_DEFERRED
+from follower_counts import FollowerCounts
 
 from error_handler import throw_error
+from thread_state import PerThreadState
 
 from sys import stdin, argv
+from hashlib import md5
+from os import close, remove
+from os.path import getsize
+from tempfile import mkstemp
+from shutil import copyfileobj
+from multiprocessing import Pool
+from cStringIO import StringIO
 from data_utilities import counts_to_stats, counts_to_stats_string
+from order_stats import QuantileSketch
 
 # delimits function name and location
 FUNC_LOC_DELIM = " "
@@ -26,9 +39,12 @@ LOC_VAL_DELIM = ";"
 FILE_END_DELIM = ":"
 
 # raw segment of the path string, without any parsed values
+# The function names and locations repeat across many segments,
+# so they are interned: each distinct string is stored once,
+# and equal strings are compared and hashed by identity.
 # original: the original string
-# function: the function name
-# location: the location at the end of the path segment
+# function: the interned function name
+# location: the interned location at the end of the path segment
 # value_str: the unparsed value string
 class PreBasicPathSegment:
 	# segment_str: the unparsed segment text
@@ -39,8 +55,8 @@ class PreBasicPathSegment:
 		val_start = loc_end + len(LOC_VAL_DELIM)
 
 		self.original = segment_str
-		self.function = segment_str[ : function_end]
-		self.location = segment_str[loc_start : loc_end]
+		self.function = intern(segment_str[ : function_end])
+		self.location = intern(segment_str[loc_start : loc_end])
 		self.value_str = segment_str[val_start : ]
 	# Generate the key to identify the section text.
 	# returns the key representing the section text
@@ -55,34 +71,147 @@ class PreBasicPathSegment:
 def call_site_to_key(function, location):
 	return (function, location)
 
+# the indices of the per-thread counts of LazyValueCounts
+DEFERRED_COUNT = 0
+PARSED_COUNT = 1
+
+# counts of the segment values whose parsing was deferred,
+# which each thread keeps separately, so that threads can count without locks
+# thread_counts: the PerThreadState of each thread's counts, as lists of
+#		 the number of values whose parsing was deferred,
+#		 and the number of deferred values that were later parsed
+class LazyValueCounts:
+	def __init__(self):
+		self.thread_counts = PerThreadState(lambda: [0, 0])
+	# Count a value whose parsing was deferred.
+	def count_deferred(self):
+		self.thread_counts.get()[DEFERRED_COUNT] += 1
+	# Count a deferred value that was parsed.
+	def count_parsed(self):
+		self.thread_counts.get()[PARSED_COUNT] += 1
+	# Get the counts of all the threads.
+	# returns the deferred and parsed counts
+	def get_counts(self):
+		deferred = 0
+		parsed = 0
+		for counts in self.thread_counts.get_all():
+			deferred += counts[DEFERRED_COUNT]
+			parsed += counts[PARSED_COUNT]
+		return (deferred, parsed)
+	# Get the counts since earlier counts.
+	# counts: the earlier deferred and parsed counts
+	# returns the deferred and parsed counts since the earlier counts
+	def counts_since(self, counts):
+		(deferred, parsed) = self.get_counts()
+		return (deferred - counts[0], parsed - counts[1])
+	# Add counts from another process.
+	# counts: the other process's deferred and parsed counts
+	def add_counts(self, counts):
+		thread_counts = self.thread_counts.get()
+		thread_counts[DEFERRED_COUNT] += counts[0]
+		thread_counts[PARSED_COUNT] += counts[1]
+
+# the counts of the deferred segment values in this process
+lazy_value_counts = LazyValueCounts()
+
+# Get the parsing counters of this process,
+# so that those of worker processes can be added to the main process.
+# returns the value cache counts and the deferred value counts
+def get_process_counts():
+	return (value_caches.get_counts(), lazy_value_counts.get_counts())
+
+# Get the parsing counters of this process since earlier counters.
+# counts: the earlier counters, from get_process_counts
+# returns the counters since the earlier counters
+def process_counts_since(counts):
+	return (value_caches.counts_since(counts[0]), \
+		lazy_value_counts.counts_since(counts[1]))
+
+# Add the parsing counters of another process to this process.
+# counts: the other process's counters, from process_counts_since
+def add_process_counts(counts):
+	value_caches.add_counts(counts[0])
+	lazy_value_counts.add_counts(counts[1])
+
 # the base class for a parsed path segment
 # have_data: do the othe fields in the segment exist?
 # function: the function name in the segment text
 # location: the code location in the segment text
-# value: the parsed value
+# value: the parsed value, once it is parsed. Read it with get_value.
+# value_parsed: is value parsed? If parsing was deferred,
+#		the value is parsed when get_value is first called.
+# value_str: the unparsed value string, until the value is parsed
+# to_add: the weight of the parsed value, until the value is parsed
+# symbol_str: the symbol of the value, which is known without parsing it
 # count: the path length at this segment
 class BasicPathSegment:
-	# pre_segment: the partly-parsed segment data
+	# pre_segment: the partly-parsed segment data,
+	#	       or another segment with data, to copy with a new weight
 	# to_add: the weight of the parsed value for statistics
-	def __init__(self, pre_segment, to_add = 1):
-		if (len(pre_segment.original) > 0):
+	# lazy: should parsing the value be deferred until it is read?
+	#	A copied segment defers its parsing if the original did.
+	def __init__(self, pre_segment, to_add = 1, lazy = False):
+		self.value_parsed = True
+		if (isinstance(pre_segment, BasicPathSegment)):
+			self.have_data = True
+
+			self.function = pre_segment.function
+			self.location = pre_segment.location
+			self.symbol_str = pre_segment.symbol_str
+			if (pre_segment.value_parsed):
+				self.value = \
+				pre_segment.value.clone_new_data(to_add)
+			else:
+				self._defer_value(pre_segment.value_str, to_add)
+		elif (len(pre_segment.original) > 0):
 			self.have_data = True
 
 			self.function = pre_segment.function
 			self.location = pre_segment.location
 
-			value_pair = parse_value(pre_segment.value_str, to_add)
-			if (value_pair is None):
-				throw_error("Failed to parse return value, " + \
-					    pre_segment.value_str)
-			self.value = value_pair[1]
+			self.symbol_str = parse_symbol(pre_segment.value_str)
+			if (lazy):
+				self._defer_value(pre_segment.value_str, to_add)
+			else:
+				self._parse_value(pre_segment.value_str, to_add)
 		else:
 			self.have_data = False
 		self.count = 0
+	# Keep the unparsed value, to parse it when it is read.
+	# value_str: the unparsed value string
+	# to_add: the weight of the parsed value
+	def _defer_value(self, value_str, to_add):
+		self.value_str = value_str
+		self.to_add = to_add
+		self.value_parsed = False
+		lazy_value_counts.count_deferred()
+	# Parse the value.
+	# value_str: the unparsed value string
+	# to_add: the weight of the parsed value
+	def _parse_value(self, value_str, to_add):
+		value_pair = parse_value(value_str, to_add)
+		if (value_pair is None):
+			throw_error("Failed to parse return value, " + value_str)
+		self.value = value_pair[1]
+	# Get the value, parsing it if its parsing was deferred,
+	# and then dropping the unparsed data.
+	# returns the parsed value
+	def get_value(self):
+		if (not self.value_parsed):
+			lazy_value_counts.count_parsed()
+			self._parse_value(self.value_str, self.to_add)
+			self.value_parsed = True
+			del self.value_str
+			del self.to_add
+			# Share the parse with a deferred record of the segment.
+			if (self.__dict__.has_key("deferred_copy")):
+				self.deferred_copy.share_value(self.value)
+				del self.deferred_copy
+		return self.value
 	def __str__(self):
 		if (self.have_data):
 			return "%s->%s()->%s"%(self.location, self.function, \
-					       str(self.value))
+					       str(self.get_value()))
 		else:
 			return "_"
 	# Generate a short representation of the segment
@@ -166,7 +295,8 @@ class SegmentIter:
 			self.index += 1
 			return old_segment
 
-# the intermediate segment identified by a call site
+# the intermediate segment identified by a call site,
+# whose value is only parsed when it is read
 # index: the index of the segment
 # follower_edge: the part of the path that follows
 # path: the path containing this segment
@@ -177,7 +307,7 @@ class CalleePathSegment(BasicPathSegment):
 	# follower_edge: follower_edge
 	def __init__(self, pre_callee_segment, index, follower_edge):
 		BasicPathSegment.__init__(self, pre_callee_segment,
-					  [follower_edge])
+					  [follower_edge], True)
 		self.index = index
 		self.follower_edge = follower_edge
 		self.path = follower_edge.path
@@ -209,15 +339,16 @@ class PreCallerSegment(PreBasicPathSegment):
 		PreBasicPathSegment.__init__(self, segment_str)
 
 # the final segment that contains caller exit data
-# general_location: combined text for the file and function name
+# general_location: interned combined text for the file and function name
 class CallerPathSegment(BasicPathSegment):
 	def __init__(self, pre_caller_segment):
 		BasicPathSegment.__init__(self, pre_caller_segment)
 		if (self.have_data):
 			file_end = self.location.find(FILE_END_DELIM)
 			file_name = self.location[ : file_end]
-			self.general_location = file_name + FUNC_LOC_DELIM + \
-						self.function
+			self.general_location = intern(file_name + \
+						       FUNC_LOC_DELIM + \
+						       self.function)
 
 
 # delimiter between path segments
@@ -263,6 +394,130 @@ class PreCallPath:
 		if (self.is_exit):
 			key += EXIT_PATH_SUFFIX
 		return key
+	# Generate a fixed-size digest of the key of the path,
+	# by hashing the parts of the segments without joining them.
+	# returns the 16-byte digest of the key from get_key
+	def get_digest(self):
+		digest = md5()
+		for segment in self.callees + [self.caller]:
+			digest.update(segment.function)
+			digest.update(FUNC_LOC_DELIM)
+			digest.update(segment.location)
+			digest.update(LOC_VAL_DELIM)
+			digest.update(segment.value_str)
+			if (not segment is self.caller):
+				digest.update(PATH_SEGMENT_DELIM)
+		if (self.is_exit):
+			digest.update(EXIT_PATH_SUFFIX)
+		return digest.digest()
+	# Check if any callee calls one of the given functions.
+	# functions: the set of function names
+	# returns true iff a callee's function is in the set
+	def calls_any(self, functions):
+		for callee in self.callees:
+			if (callee.function in functions):
+				return True
+		return False
+
+# the original text of loaded segments, which is only checked for emptiness
+LOADED_ORIGINAL = PATH_SEGMENT_DELIM
+
+# segment data loaded from a columnar log, rather than parsed from text.
+# One is shared by all the uses of the segment.
+# original: LOADED_ORIGINAL, or empty if the original text was empty
+# key: the key from get_key, once it is generated
+class LoadedPreSegment(PreCallerSegment):
+	# function: the interned function name
+	# location: the interned location
+	# value_str: the unparsed value string
+	# have_data: was the original text not empty?
+	def __init__(self, function, location, value_str, have_data):
+		self.function = function
+		self.location = location
+		self.value_str = value_str
+		self.key = None
+		self.original = ""
+		if (have_data):
+			self.original = LOADED_ORIGINAL
+	def get_key(self):
+		if (self.key is None):
+			self.key = PreBasicPathSegment.get_key(self)
+		return self.key
+
+# a use of a segment loaded from a columnar log, as an intermediate call site
+# segment: the shared LoadedPreSegment
+class LoadedPreCalleeSegment(PreCalleeSegment):
+	# segment: segment
+	# count: the length of the segment
+	def __init__(self, segment, count):
+		self.original = segment.original
+		self.function = segment.function
+		self.location = segment.location
+		self.value_str = segment.value_str
+		self.segment = segment
+		self.count = count
+	def get_key(self):
+		return self.segment.get_key()
+
+# a path loaded from a columnar log, whose segments are already normalized
+class LoadedPreCallPath(PreCallPath):
+	# callees: the intermediate LoadedPreCalleeSegment objects
+	# caller: the caller LoadedPreSegment
+	# is_exit: did the path end because of an exit?
+	def __init__(self, callees, caller, is_exit):
+		self.is_exit = is_exit
+		self.caller = caller
+		self.callees = callees
+		self.n_callees = len(callees)
+	def get_key(self):
+		key = PATH_SEGMENT_DELIM.join(map(lambda segment: \
+						  segment.get_key(), \
+						  self.callees + [self.caller]))
+		if (self.is_exit):
+			key += EXIT_PATH_SUFFIX
+		return key
+	def __str__(self):
+		return self.get_key()
+
+# Load the paths of a columnar log, and its NEW FILE markers.
+# log: the columnar_log.ColumnarLog
+# returns an iterator over path number and path pairs,
+#	  where the path is a LoadedPreCallPath,
+#	  or None for a NEW FILE marker
+def load_pre_paths(log):
+	functions = log.functions
+	locations = log.locations
+	values = log.values
+	segments = map(lambda function_id, location_id, value_id, have_data: \
+		       LoadedPreSegment(functions[function_id], \
+					locations[location_id], \
+					values[value_id], have_data != 0), \
+		       log.segment_functions, log.segment_locations, \
+		       log.segment_values, log.segment_data)
+	path_starts = log.path_starts
+	path_segments = log.path_segments
+	path_counts = log.path_counts
+	path_exits = log.path_exits
+	new_files = log.new_files
+	n_new_files = len(new_files)
+	new_file_i = 0
+	for path_i in xrange(log.n_paths):
+		while (new_file_i < n_new_files and \
+		       new_files[new_file_i] == path_i):
+			yield (path_i, None)
+			new_file_i += 1
+		caller_i = path_starts[path_i + 1] - 1
+		callees = []
+		for segment_i in xrange(path_starts[path_i], caller_i):
+			callees.append(LoadedPreCalleeSegment( \
+				       segments[path_segments[segment_i]], \
+				       path_counts[segment_i]))
+		yield (path_i + 1, \
+		       LoadedPreCallPath(callees, \
+					 segments[path_segments[caller_i]], \
+					 path_exits[path_i] != 0))
+	for new_file_i in range(new_file_i, n_new_files):
+		yield (log.n_paths, None)
 
 # contains the processed path data
 # is_exit: did the path end because of an exit?
@@ -271,6 +526,7 @@ class PreCallPath:
 # is_error_exit: did the path exit because of an error?
 # callees: the intermediate, callee segments
 # length: the length of the path
+# deferred: the DeferredPath of the path, once a call site is deferred
 class CallPath:
 	def __init__(self, pre_call_path):
 		self.is_exit = pre_call_path.is_exit
@@ -278,7 +534,7 @@ class CallPath:
 		self.caller_location = self.caller.general_location
 		self.is_error_exit = False
 		if (self.is_exit):
-			self.is_error_exit = not self.caller.value.is_exactly(0)
+			self.is_error_exit = not self.caller.get_value().is_exactly(0)
 
 		follower = self.caller
 		n_callees = pre_call_path.n_callees
@@ -294,6 +550,14 @@ class CallPath:
 		self.length = 0
 		if (n_callees > 1):
 			self.length = self.callees[0].count
+		self.deferred = None
+	# Get the parts of the path needed by its deferred call sites,
+	# creating them on first use.
+	# returns the DeferredPath
+	def get_deferred(self):
+		if (self.deferred is None):
+			self.deferred = DeferredPath(self)
+		return self.deferred
 	def __str__(self):
 		header = str(self.caller) + "\n" + str(len(self.callees))
 		segment_list_str =  "\n".join(map(str, self.callees))
@@ -307,6 +571,66 @@ class CallPath:
 		";".join(map(lambda callee: callee.short_str(), self.callees))
 		return header + ":" + segment_list_str
 
+# the parts of a CallPath that the statistics of its call sites need,
+# kept for the call sites whose statistics are deferred,
+# instead of the whole path
+# caller: the caller segment
+# caller_location: the end location of the path
+# is_error_exit: did the path exit because of an error?
+class DeferredPath:
+	# path: the CallPath
+	def __init__(self, path):
+		self.caller = path.caller
+		self.caller_location = path.caller_location
+		self.is_error_exit = path.is_error_exit
+
+# the follower edge of a deferred call site,
+# which keeps the length after the site, but not the following segments
+class DeferredEdge(FollowerEdge):
+	# count: the length after the site
+	# path: the DeferredPath of the site
+	# index: the index of the following segment
+	def __init__(self, count, path, index):
+		self.follower = None
+		self.count = count
+		self.path = path
+		self.index = index
+
+# a call site whose statistics are deferred, holding only what
+# AutoEPExParser.add_callee needs, so that it can be stored compactly,
+# and spilled to disk, as in deferred_sites.DeferredSites.
+# If its value was not parsed yet, it is still only parsed when it is read.
+# index: the index of the segment
+# follower_edge: the DeferredEdge after the segment
+# path: the DeferredPath containing the segment
+class DeferredCalleeSegment(BasicPathSegment):
+	# callee: the CalleePathSegment
+	# path: the CallPath containing the segment
+	def __init__(self, callee, path):
+		self.index = callee.index
+		self.path = path.get_deferred()
+		self.follower_edge = DeferredEdge(callee.follower_edge.count, \
+						  self.path, \
+						  callee.follower_edge.index)
+		# The copy is a deferral of its own,
+		# unless the callee is parsed first, and shares its value.
+		BasicPathSegment.__init__(self, callee, [self.follower_edge])
+		self.count = callee.count
+		if (not self.value_parsed):
+			callee.deferred_copy = self
+	# Take the value parsed by the original segment,
+	# if this record's value is not yet parsed.
+	# value: the parsed value of the original segment
+	def share_value(self, value):
+		if (not self.value_parsed):
+			self.value = value.clone_new_data(self.to_add)
+			self.value_parsed = True
+			del self.value_str
+			del self.to_add
+	def __str__(self):
+		return "%s[%d]"%(BasicPathSegment.__str__(self), \
+				 self.follower_edge.count)
+
 # prefix for vote statistic lines
 VOTE_STAT_PREFIX = "Votes:"
 # denotes that the information is about the function
@@ -340,12 +664,40 @@ class VotePoint:
 					      str(self.length), \
 					      str(self.chosen_threshold)])
 
+# what FunctionCalls keeps about the paths through each call site:
+# the call site segments and paths themselves,
+# only the facts that check_specs needs, as in get_site_fact,
+# or nothing, when only the statistics are needed
+RETAIN_PATHS = "paths"
+RETAIN_CHECK = "check"
+RETAIN_STATS = "stats"
+
+# Get the facts about a path through a call site
+# that check_specs needs to check the site.
+# segment: the call site segment
+# path: the path containing the segment
+# returns whether the return value has a symbol,
+#	  whether it is wrapped by the caller, whether it is unknown,
+#	  and the caller location of the path
+def get_site_fact(segment, path):
+	value = segment.get_value()
+	have_symbol = value.have_symbol()
+	wrapped = False
+	if (have_symbol):
+		wrapped = value.same_assignments(path.caller.get_value())
+	return (have_symbol, wrapped, value.is_unknown(), path.caller_location)
+
 # information about calls to a function in a program
 # name: the name of the function
-# branch_stat: branch statistics for each return value constraint
+# branch_stat: branch statistics for each return value constraint,
+#	       counting the following paths as follower_counts.FollowerCounts
 # callee_type: the return type
 # rangify: is the return value represented as a type?
-# site_paths: maps call sites to paths that pass through them
+# retention: what is kept about the paths through each call site:
+#	     RETAIN_PATHS, RETAIN_CHECK or RETAIN_STATS
+# site_paths: maps call sites to the paths that pass through them,
+#	      as call site segment and path pairs, or their facts,
+#	      depending on retention
 # bin_limit: the maximum number of bins
 # low_ratio: the number of standard deviations that a low value should be
 #	     below the average
@@ -366,12 +718,14 @@ class FunctionCalls:
 	# bin_limit: bin_limit
 	# low_ratio: low_ratio
 	# high_ratio: high_ratio
+	# retention: retention
 	def __init__(self, callee_segment, path, bin_limit, \
-		     low_ratio, high_ratio):
+		     low_ratio, high_ratio, retention = RETAIN_PATHS):
 		self.name = callee_segment.function
-		self.branch_stat = initialize_stat(callee_segment.value, True)
-		self.callee_type = callee_segment.value.type_marker
+		self.branch_stat = initialize_stat(callee_segment.get_value(), True)
+		self.callee_type = callee_segment.get_value().type_marker
 		self.rangify = self.callee_type == INT_TYPE_START
+		self.retention = retention
 		self.site_paths = {}
 
 		self.bin_limit = bin_limit
@@ -391,30 +745,49 @@ class FunctionCalls:
 	# callee_segment: the first call site to add
 	# path: the first path to add
 	def add(self, callee_segment, path):
-		site_key = callee_segment.location
-
-		these_site_paths = None
-		if (self.site_paths.has_key(site_key)):
-			these_site_paths = self.site_paths[site_key]
-		else:
-			these_site_paths = []
-			self.site_paths[site_key] = these_site_paths
-		these_site_paths.append((callee_segment, path))
+		if (self.retention != RETAIN_STATS):
+			self.add_site_path(callee_segment, path)
 
-		value = \
-		callee_segment.value \
-			      .clone_new_data([callee_segment.follower_edge])
-		self.branch_stat.update(value)
+		self.branch_stat.update(callee_segment.get_value(), \
+					FollowerCounts([callee_segment.follower_edge]))
 
-		if (path.caller.value.type_marker == VOID_TYPE_START):
+		if (path.caller.get_value().type_marker == VOID_TYPE_START):
 			return
 
-		if (path.caller.value.is_unknown()):
+		if (path.caller.get_value().is_unknown()):
 			self.unknown_count += 1
 			self.unknown_vote.tally(True, 1)
 		else:
 			self.known_count += 1
 			self.unknown_vote.tally(False, 1)
+	# Keep what the retention allows about a path through a call site.
+	# callee_segment: the call site
+	# path: the path
+	def add_site_path(self, callee_segment, path):
+		site_key = callee_segment.location
+
+		these_site_paths = None
+		if (self.site_paths.has_key(site_key)):
+			these_site_paths = self.site_paths[site_key]
+		else:
+			these_site_paths = []
+			self.site_paths[site_key] = these_site_paths
+		if (self.retention == RETAIN_CHECK):
+			these_site_paths.append(get_site_fact(callee_segment, path))
+		else:
+			these_site_paths.append((callee_segment, path))
+	# Add the call sites of the same function from a later part of the log.
+	# other: the FunctionCalls object from the later part
+	def merge(self, other):
+		for (site_key, other_site_paths) in other.site_paths.items():
+			if (self.site_paths.has_key(site_key)):
+				self.site_paths[site_key] += other_site_paths
+			else:
+				self.site_paths[site_key] = other_site_paths
+		self.branch_stat.merge(other.branch_stat)
+		self.unknown_count += other.unknown_count
+		self.known_count += other.known_count
+		self.unknown_vote.merge(other.unknown_vote)
 	# Based on the number of unknown return values,
 	# the return value is unchecked.
 	# returns true iff there are significantly more unknown return values
@@ -427,6 +800,19 @@ class FunctionCalls:
 	#	  mapping call sites to the paths that go through them
 	def get_site_paths(self):
 		return self.site_paths.items()
+	# Get a list of this program's pairs of call sites
+	# and the facts about the paths that run through them,
+	# as in get_site_fact. Nothing is returned if only the statistics
+	# were kept.
+	# returns the site-facts pairs
+	def get_site_facts(self):
+		if (self.retention != RETAIN_PATHS):
+			return self.site_paths.items()
+		return map(lambda (site_key, site_paths): \
+			   (site_key, \
+			    map(lambda (segment, path): \
+				get_site_fact(segment, path), site_paths)), \
+			   self.site_paths.items())
 	# Generate a string representation of the values.
 	# returns a string representing value statistics
 	def values_str(self):
@@ -495,19 +881,14 @@ class FunctionCalls:
 			if (is_undefined(self.callee_type, key)):
 				continue
 
-			exit_count = 0
-			path_lengths = []
-			for follower in followers:
-				if (follower.path.is_error_exit):
-					exit_count += 1
-				path_lengths.append(follower.count)
+			exit_count = followers.n_error_exits
 
 			count = original_count - exit_count
 			if (exit_count > 0):
 				most_exit_vote.tally(index, exit_count)
 			if (original_count > 0):
 				(_, _, median_length, _) = \
-				counts_to_stats(path_lengths)
+				counts_to_stats(followers)
 				point = VotePoint(count, median_length)
 				self.vote_points.append((key, point))
 			index += 1
@@ -600,6 +981,9 @@ BIN_LIMIT = 6.0
 THRESHOLD_RATIO = 1.0
 # the voting ratio by which the winner must lead
 VOTE_RATIO = 1.0
+# the most statistics of later programs that are kept pending per function,
+# before they are added to the sum all at once
+PENDING_LIMIT = 64
 
 # the main parser for the checker output
 # bin_limit: the maximum number of different constraints
@@ -607,11 +991,18 @@ VOTE_RATIO = 1.0
 #	     below the average
 # high_ratio: the number of standard deviations that a high value should be
 #	      above the average
-# seen: the seen paths in the current file
+# seen: the seen paths in the current file, as a seen_paths.SeenPaths
+# allowlist: the names of the functions to analyze, or None for all functions
+# write_paths: should each new path be written to the output,
+#	       or only the program summary from finish?
+# retention: what the functions keep about the paths through their call sites,
+#	     as in FunctionCalls
 # functions: the statistics organized by function
+# function_keys: the keys of functions, in the order they were added
 # not_wrapped: call sites where we know the return value is not wrapped
 # maybe_wrapped: call sites for which we have not found cases where
-#		 the return value is not wrapped
+#		 the return value is not wrapped, as DeferredCalleeSegment
+#		 records in a deferred_sites.DeferredSites
 # 
 class AutoEPExParser(OutputParser):
 	# output_handle: the output stream
@@ -619,25 +1010,37 @@ class AutoEPExParser(OutputParser):
 	# bin_limit: bin_limit
 	# low_ratio: low_ratio
 	# high_ratio: high_ratio
+	# seen_mode: how the seen paths are stored, as in seen_paths.init_seen_paths
+	# allowlist: allowlist
+	# write_paths: write_paths
+	# retention: retention
+	# max_deferred: the number of maybe_wrapped records kept in memory
 	def __init__(self, output_handle, input_handle = stdin, \
 		     bin_limit = BIN_LIMIT, low_ratio = THRESHOLD_RATIO, \
-		     high_ratio = THRESHOLD_RATIO):
+		     high_ratio = THRESHOLD_RATIO, seen_mode = SEEN_KEYS, \
+		     allowlist = None, write_paths = True, \
+		     retention = RETAIN_PATHS, \
+		     max_deferred = DEFAULT_MAX_DEFERRED):
 		OutputParser.__init__(self, AUTO_EPEX_START, \
 				      output_handle, input_handle)
 		self.bin_limit = bin_limit
 		self.low_ratio = low_ratio
 		self.high_ratio = high_ratio
+		self.allowlist = allowlist
+		self.write_paths = write_paths
+		self.retention = retention
 
-		self.seen = {}
+		self.seen = init_seen_paths(seen_mode)
 		self.functions = {}
+		self.function_keys = []
 		self.not_wrapped = set()
-		self.maybe_wrapped = {}
+		self.maybe_wrapped = DeferredSites(max_deferred)
 	# Add a call site.
 	# callee: the call site
 	# path: the path containing the call site
 	def add_callee(self, callee, path):
 		function_name = callee.function
-		callee_type = callee.value.type_marker
+		callee_type = callee.get_value().type_marker
 		key = (function_name, callee_type)
 		# Add the call site to the function if it already exists.
 		# Otherwise, create the function data object.
@@ -646,19 +1049,28 @@ class AutoEPExParser(OutputParser):
 		else:
 			self.functions[key] = \
 			FunctionCalls(callee, path, self.bin_limit, \
-				      self.low_ratio, self.high_ratio)
+				      self.low_ratio, self.high_ratio, \
+				      self.retention)
+			self.function_keys.append(key)
+	# Add the functions parsed from a later part of the log.
+	# functions: the later part's statistics organized by function
+	# function_keys: the keys of the later part's functions,
+	#		 in the order they were added
+	def merge_functions(self, functions, function_keys):
+		for key in function_keys:
+			if (self.functions.has_key(key)):
+				self.functions[key].merge(functions[key])
+			else:
+				self.functions[key] = functions[key]
+				self.function_keys.append(key)
 	# When we know a call site's return value
 	# is not simply wrapped by the caller,
 	# record all the previous instances of the site to the statistics.
 	# site_key: the key for the site to record as not wrapped
 	def add_unwrapped(self, site_key):
 		if (self.maybe_wrapped.has_key(site_key)):
-			sites = self.maybe_wrapped[site_key]
-
-			for (callee, path) in sites:
-				self.add_callee(callee, path)
-
-			del self.maybe_wrapped[site_key]
+			for callee in self.maybe_wrapped.take(site_key):
+				self.add_callee(callee, callee.path)
 	# Handle a single call site segment in a path.
 	# callee: the call site segment
 	# path: the path containing the segment
@@ -666,13 +1078,17 @@ class AutoEPExParser(OutputParser):
 		# Ignore empty segments (this should not occur).
 		if (not callee.have_data):
 			return
+		# Ignore functions that are not analyzed.
+		if (not self.allowlist is None and \
+		    not callee.function in self.allowlist):
+			return
 		site_key = callee.get_key()
 		should_add = None
 
 		# Check and update if the site is wrapped.
 		if (site_key in self.not_wrapped):
 			should_add = True
-		elif (not path.caller.value.same_assignments(callee.value)):
+		elif (not path.caller.get_value().same_symbol(callee.symbol_str)):
 			self.not_wrapped.add(site_key)
 			should_add = True
 		else:
@@ -684,11 +1100,8 @@ class AutoEPExParser(OutputParser):
 			self.add_unwrapped(site_key)
 			self.add_callee(callee, path)
 		else:
-			maybe_entry = (callee, path)
-			if (self.maybe_wrapped.has_key(site_key)):
-				self.maybe_wrapped[site_key].append(maybe_entry)
-			else:
-				self.maybe_wrapped[site_key] = [maybe_entry]
+			self.maybe_wrapped.add(site_key, \
+					       DeferredCalleeSegment(callee, path))
 	# Get a list of all programs' pairs of call sites
 	# and the list of paths that run through them.
 	# returns the site-paths pairs of the dictionary
@@ -698,37 +1111,280 @@ class AutoEPExParser(OutputParser):
 		for (key, function_data) in self.functions.items():
 			site_paths.append((key, function_data.get_site_paths()))
 		return site_paths
+	# Get a list of all programs' pairs of call sites
+	# and the facts about the paths that run through them.
+	# returns the site-facts pairs of each function,
+	#	  as in FunctionCalls.get_site_facts
+	def get_site_facts(self):
+		site_facts = []
+		for (key, function_data) in self.functions.items():
+			site_facts.append((key, function_data.get_site_facts()))
+		return site_facts
+	# Iterate over the prefixed lines in the input,
+	# or the paths of a columnar log, which are already partly parsed,
+	# in batches.
+	# returns an iterator over the parser_utils.LineBatch objects,
+	#	  whose payloads are the lines without the prefix,
+	#	  or the LoadedPreCallPath objects, or None for NEW FILE markers
+	def prefixed_batches(self):
+		if (isinstance(self.input_handle, ColumnarLog)):
+			return batch_lines(load_pre_paths(self.input_handle))
+		return OutputParser.prefixed_batches(self)
+	# Reset the wrapping data upon a new file.
+	def handle_new_file(self):
+		self.not_wrapped = set()
+		self.maybe_wrapped.clear()
 	# Handle a line, which could indicate a new file, or contain a path.
-	# line: the line
-	# returns the path if the line contains one
+	# line: the line, or the path or None loaded from a columnar log,
+	#	as in prefixed_batches
+	# returns the path if the line contains one, and there is an output
 	def handle_line(self, line):
-		# Reset the wrapping data upon a new file.
+		if (line is None):
+			self.handle_new_file()
+			return None
+		if (isinstance(line, PreCallPath)):
+			return self.handle_pre_path(line)
 		if (line.rstrip() == NEW_FILE_MARKER):
-			self.not_wrapped = set()
-			self.maybe_wrapped = {}
+			self.handle_new_file()
 			return None
-		pre_path = PreCallPath(line)
-		path_key = pre_path.get_key()
-		if (self.seen.has_key(path_key)):
+		return self.handle_pre_path(PreCallPath(line))
+	# Handle a batch of lines, in the same way as handle_line,
+	# and write the paths.
+	# batch: the parser_utils.LineBatch
+	def handle_lines(self, batch):
+		payloads = batch.payloads
+		handle_pre_path = self.handle_pre_path
+		for index in range(len(payloads)):
+			batch.index = index
+			line = payloads[index]
+			if (line is None):
+				self.handle_new_file()
+				continue
+			if (not isinstance(line, PreCallPath)):
+				if (line.rstrip() == NEW_FILE_MARKER):
+					self.handle_new_file()
+					continue
+				line = PreCallPath(line)
+			line_result = handle_pre_path(line)
+			if (not line_result is None):
+				self.write(line_result + "\n")
+	# Handle a partly-parsed path.
+	# pre_path: the PreCallPath
+	# returns the path if it is new, and there is an output
+	def handle_pre_path(self, pre_path):
+		# Skip paths that do not call any analyzed functions.
+		if (not self.allowlist is None and \
+		    not pre_path.calls_any(self.allowlist)):
+			return None
+		path_key = self.seen.path_key(pre_path)
+		if (path_key in self.seen):
 			return None
 
-		self.seen[path_key] = 1
+		self.seen.add(path_key)
 		path = CallPath(pre_path)
 
 		for callee in path.callees:
 			self.handle_callee(callee, path)
 
+		# Writing the path would parse all of its values.
+		if (self.output_handle is None or not self.write_paths):
+			return None
 		return str(path) + "\n"
 	# Generate votes and output a program summary.
+	# The summary is written one function at a time,
+	# instead of being returned as a single string.
+	# returns None
 	def finish(self):
-		function_summary = ""
+		self.maybe_wrapped.clear()
+		self.write("Function information:\n")
 		for (name, function) in sort_by_key(self.functions):
 			function.generate_votes()
-			function_summary += function.vote_str() + "\n"
-		callsite_summary = ""
-
-		return "Function information:\n" + function_summary + \
-		       "Per call-site profiles:\n" + callsite_summary
+			self.write(function.vote_str() + "\n")
+		self.write("Per call-site profiles:\n")
+		return None
+
+# Check if a log line marks the beginning of a new file.
+# line: the raw line from the log
+# returns true iff the line is the prefixed NEW_FILE_MARKER
+def is_new_file_line(line):
+	prefix_len = len(AUTO_EPEX_START)
+	return line[ : prefix_len] == AUTO_EPEX_START and \
+	       line[prefix_len : ].rstrip() == NEW_FILE_MARKER
+
+# Find the byte offsets at which to split a log file for parallel parsing.
+# Every offset after the first is the start of a NEW_FILE_MARKER line,
+# so the wrapping data never has to cross a split.
+# in_name: the path to the log file
+# n_parts: the desired number of parts
+# returns the offsets of the starts of the parts,
+#	  followed by the size of the file
+def find_log_splits(in_name, n_parts):
+	size = getsize(in_name)
+	offsets = [0]
+	input_file = open(in_name, "r")
+	for part_i in range(1, n_parts):
+		target = size * part_i / n_parts
+		if (target <= offsets[-1]):
+			continue
+		# Move to the start of the first line at or after the target.
+		input_file.seek(target - 1)
+		position = target - 1 + len(input_file.readline())
+		while (position < size):
+			line = input_file.readline()
+			if (is_new_file_line(line)):
+				break
+			position += len(line)
+		if (position >= size):
+			break
+		offsets.append(position)
+	input_file.close()
+	offsets.append(size)
+	return offsets
+
+# collects the keys of all the paths in the log, without parsing them further
+# keys: the set of the keys of the paths
+# key_paths: the empty seen paths, which generate the keys
+class PathKeyCollector(OutputParser):
+	# input_handle: the input stream
+	# seen_mode: the mode of the seen paths whose keys are collected
+	def __init__(self, input_handle, seen_mode = SEEN_KEYS):
+		OutputParser.__init__(self, AUTO_EPEX_START, None, input_handle)
+		self.keys = set()
+		self.key_paths = init_seen_paths(seen_mode)
+	def handle_line(self, line):
+		if (line.rstrip() == NEW_FILE_MARKER):
+			return None
+		self.keys.add(self.key_paths.path_key(PreCallPath(line)))
+		return None
+
+# Collect the path keys in a part of a log file in a worker process.
+# job: the log path, the start and end offsets of the part,
+#      and the mode of the seen paths
+# returns the set of the keys of the paths in the part
+def collect_part_keys(job):
+	(in_name, start, end, seen_mode) = job
+	input_lines = MappedLines(in_name, start, end)
+	collector = PathKeyCollector(input_lines, seen_mode)
+	collector.read_lines()
+	input_lines.close()
+	return collector.keys
+
+# Parse a part of a log file in a worker process.
+# job: the log path, the start and end offsets of the part,
+#      the keys of the paths already seen in earlier parts,
+#      the parser parameters, the mode of the seen paths,
+#      the names of the functions to analyze, or None for all functions,
+#      what the functions keep about the paths through their call sites,
+#      the number of deferred call sites kept in memory,
+#      and the path to which to write the part's path output, or None
+# returns the part's statistics organized by function,
+#	  the keys of the functions in the order they were added,
+#	  the estimated number of paths wrongly dropped as seen,
+#	  and the part's parsing counters, as in process_counts_since
+def parse_part(job):
+	(in_name, start, end, seen_keys, bin_limit, low_ratio, high_ratio, \
+	 seen_mode, allowlist, retention, max_deferred, part_out_name) = job
+	part_output_file = None
+	if (not part_out_name is None):
+		part_output_file = open(part_out_name, "w")
+	process_counts = get_process_counts()
+	input_lines = MappedLines(in_name, start, end)
+	parser = AutoEPExParser(part_output_file, input_lines, \
+				bin_limit, low_ratio, high_ratio, seen_mode, \
+				allowlist, retention = retention, \
+				max_deferred = max_deferred)
+	for key in seen_keys:
+		parser.seen.add(key)
+	parser.read_lines(False)
+	parser.seen.close()
+	parser.maybe_wrapped.clear()
+	input_lines.close()
+	if (not part_output_file is None):
+		part_output_file.close()
+	return (parser.functions, parser.function_keys, \
+		parser.seen.estimated_false_drops, \
+		process_counts_since(process_counts))
+
+# Parse a single log file on multiple processes,
+# by splitting it at NEW_FILE_MARKER lines.
+# First, the path keys of each part are collected into the seen paths
+# of the merged parser, so that each part can skip the paths seen
+# in earlier parts.
+# Then the parts are parsed, and merged in order,
+# so the results are the same as those of AutoEPExParser.read_lines.
+# in_name: the path to the log file
+# output_handle: the output stream
+# n_jobs: the number of worker processes
+# bin_limit: the maximum number of different constraints
+# low_ratio: the number of standard deviations that a low value should be
+#	     below the average
+# high_ratio: the number of standard deviations that a high value should be
+#	      above the average
+# seen_mode: how the seen paths are stored, as in seen_paths.init_seen_paths
+# allowlist: the names of the functions to analyze, or None for all functions
+# write_paths: should the paths be written, or only the program summary?
+# retention: what the functions keep about the paths through their call sites,
+#	     as in FunctionCalls
+# max_deferred: the number of deferred call sites kept in memory by each parser
+# returns the AutoEPExParser holding the merged data
+def parse_log_split(in_name, output_handle, n_jobs, bin_limit = BIN_LIMIT, \
+		    low_ratio = THRESHOLD_RATIO, high_ratio = THRESHOLD_RATIO, \
+		    seen_mode = SEEN_KEYS, allowlist = None, write_paths = True, \
+		    retention = RETAIN_PATHS, \
+		    max_deferred = DEFAULT_MAX_DEFERRED):
+	offsets = find_log_splits(in_name, n_jobs)
+	n_parts = len(offsets) - 1
+	pool = Pool(n_jobs)
+	parser = AutoEPExParser(output_handle, None, bin_limit, low_ratio, \
+				high_ratio, seen_mode, allowlist, write_paths, \
+				retention, max_deferred)
+
+	# Find the paths that earlier parts have already seen,
+	# in the seen paths of the chosen mode.
+	part_ranges = []
+	for part_i in range(n_parts):
+		part_ranges.append((in_name, offsets[part_i], \
+				    offsets[part_i + 1]))
+	key_jobs = map(lambda part_range: part_range + (seen_mode,), \
+		       part_ranges)
+	seen = parser.seen
+	part_seen = []
+	for part_keys in pool.imap(collect_part_keys, key_jobs):
+		part_seen.append(filter(lambda key: key in seen, part_keys))
+		for key in part_keys:
+			seen.add(key)
+
+	# Parse the parts.
+	jobs = []
+	part_out_names = []
+	for part_i in range(n_parts):
+		part_out_name = None
+		if (not output_handle is None and write_paths):
+			(part_out_fd, part_out_name) = mkstemp()
+			close(part_out_fd)
+		part_out_names.append(part_out_name)
+		jobs.append(part_ranges[part_i] + \
+			    (part_seen[part_i], bin_limit, low_ratio, \
+			     high_ratio, seen_mode, allowlist, retention, \
+			     max_deferred, part_out_name))
+	part_i = 0
+	for (functions, function_keys, false_drops, process_counts) in \
+	    pool.imap(parse_part, jobs):
+		parser.merge_functions(functions, function_keys)
+		parser.seen.estimated_false_drops += false_drops
+		add_process_counts(process_counts)
+		part_out_name = part_out_names[part_i]
+		if (not part_out_name is None):
+			part_output_file = open(part_out_name, "r")
+			copyfileobj(part_output_file, output_handle)
+			part_output_file.close()
+			remove(part_out_name)
+		part_i += 1
+	pool.close()
+	pool.join()
+
+	parser.finish()
+	return parser
 
 # the inferred error specification
 # errors: lookup table for the vote results for the error specification
@@ -767,6 +1423,16 @@ class ErrorSpec:
 			return self.checkers[key].overlaps(other_label)
 		else:
 			return False
+	# Check which of some labels the function's error specification
+	# at least partly covers, all at once.
+	# key: the key for the error specification
+	# other_labels: the values to check for coverage
+	# returns the list of the truth of the overlap of each value
+	def covers_many(self, key, other_labels):
+		if (self.checkers.has_key(key)):
+			return self.checkers[key].overlaps_many(other_labels)
+		else:
+			return [False] * len(other_labels)
 	# Get the error specification for a function.
 	# function: the function name
 	# return_type: the return type of the function
@@ -777,26 +1443,26 @@ class ErrorSpec:
 			return self.errors[key][1]
 		else:
 			return None
-	def __str__(self):
-		# Generate the error specification file.
+	# Write the error specification file, one specification at a time.
+	# stream: the stream to write to
+	def write_to(self, stream):
 		sorted_pairs = sort_by_key(self.errors)
-		to_return = ""
 		for ((function, return_type), (function, value)) in \
 		     sorted_pairs:
 			if (value is None or value.choose_infallible()):
-				to_return += "%s%s %s %s"%(ERROR_SPEC_PREFIX,
-							   function, \
-							   return_type, \
-							   INFALLIBLE_MARKER)
+				stream.write("%s%s %s %s\n"%(ERROR_SPEC_PREFIX,
+							     function, \
+							     return_type, \
+							     INFALLIBLE_MARKER))
 			elif (value.have_valid_result()):
-				to_return += "%s%s %s %s"%(ERROR_SPEC_PREFIX,
-							   function, \
-							   return_type, \
-							   value)
-			else:
-				continue
-			to_return += "\n"
-		return to_return
+				stream.write("%s%s %s %s\n"%(ERROR_SPEC_PREFIX,
+							     function, \
+							     return_type, \
+							     value))
+	def __str__(self):
+		stream = StringIO()
+		self.write_to(stream)
+		return stream.getvalue()
 
 # delimiter between multiple error specification ranges
 ERRORS_DELIM = ","
@@ -882,6 +1548,7 @@ class VoteResult:
 
 # integer-specific voting results
 # range_votes: the votes for range nodes
+# pending_votes: the votes that are not yet added to range_votes
 class RangeVoteResult(VoteResult):
 	# threshold_ratio: the threshold ratio for the winning votes
 	# as_list: determines if the ranges
@@ -889,11 +1556,17 @@ class RangeVoteResult(VoteResult):
 	def __init__(self, threshold_ratio, as_list = False):
 		VoteResult.__init__(self, threshold_ratio, as_list)
 		self.range_votes = RangeList([], as_list)
+		self.pending_votes = []
 	def _count_vote(self, decision, increment):
-		self.range_votes \
-		    .add(decision.clone_new_value(increment))
-	# Tally the range nodes.
+		self.pending_votes.append(decision.clone_new_value(increment))
+	# Add the pending votes all at once, and tally the range nodes.
 	def preprocess_winners(self):
+		if (len(self.pending_votes) > 0):
+			self.range_votes = \
+			RangeList.merge_all([self.range_votes] + \
+					    self.pending_votes, \
+					    self.range_votes.as_list)
+			self.pending_votes = []
 		for (range_node, range_count) in self.range_votes:
 			if (range_count > 0):
 				self.votes.tally(range_node, range_count)
@@ -923,7 +1596,8 @@ def init_vote_result(stat_type, threshold_ratio):
 # the inter-program vote holder
 # function_name: the name of the function
 # votes: the per-program votes
-# counts: the number of appearances of the function per program
+# counts: the number of appearances of the function per program,
+#	  in a list, or summarized by an order_stats.QuantileSketch
 # stat_type: the return type
 # rangify: if the type is an integer, the constraints must be ranges
 # as_list: False for integers, None otherwise. Used for VoteResult
@@ -936,11 +1610,17 @@ def init_vote_result(stat_type, threshold_ratio):
 #	      above the average
 # vote_ratio: the threshold ratio for the winning votes
 class Vote:
+	# sketch_capacity: the capacity of the QuantileSketch of the counts,
+	#		   or None to keep all of them
 	def __init__(self, function_name, stat_type, \
-		     bin_limit, low_ratio, high_ratio, vote_ratio):
+		     bin_limit, low_ratio, high_ratio, vote_ratio, \
+		     sketch_capacity = None):
 		self.function_name = function_name
 		self.votes = {}
-		self.counts = []
+		if (sketch_capacity is None):
+			self.counts = []
+		else:
+			self.counts = QuantileSketch(sketch_capacity)
 		self.stat_type = stat_type
 		rangify = stat_type == INT_TYPE_START
 		self.rangify = rangify
@@ -1048,9 +1728,75 @@ class PredictionRow:
 	def get_key(self):
 		return (self.function, self.return_type)
 
+# records the votes cast by a program, so that they can be replayed later
+# votes: the recorded (key, share, strength) triples, in casting order
+class VoteRecord:
+	def __init__(self):
+		self.votes = []
+	# Record a single constraint vote.
+	# key: the constraint
+	# share: the weight to add
+	# strength: the number of appearances of the function in the program
+	def record_vote(self, key, share, strength):
+		self.votes.append((key, share, strength))
+	# Record a set of constraint votes.
+	# votes: the constraints
+	# strength: the number of appearances of the function in the program
+	def record_votes(self, votes, strength):
+		for vote in votes:
+			self.record_vote(vote, 1.0 / len(votes), strength)
+	# Cast the recorded votes again.
+	# vote_holder: the object in which to cast the votes
+	def replay(self, vote_holder):
+		for (key, share, strength) in self.votes:
+			vote_holder.record_vote(key, share, strength)
+
+# compact, picklable summary of the calls to a function in a program,
+# holding only what AutoEPExSum needs
+# type_marker: the return type
+# normalized: the normalized constraint statistics
+# unnormalized: the unnormalized constraint statistics
+# unknown_count: the number of sites
+#		 where the return value is completely unknown
+# known_count: the number of sites
+#	       where the return value is at least partly known
+# vote_record: the votes cast by the program
+class FunctionSummary:
+	# function_calls: the FunctionCalls object, after voting
+	def __init__(self, function_calls):
+		stat = function_calls.branch_stat
+		self.type_marker = stat.type_marker
+		self.normalized = stat.gen_normalized()
+		self.unnormalized = stat.gen_unnormalized()
+		self.unknown_count = function_calls.unknown_count
+		self.known_count = function_calls.known_count
+		self.vote_record = VoteRecord()
+		function_calls.cast_vote(self.vote_record)
+	# Cast the vote for this program.
+	# vote_holder: the object in which to cast the vote
+	def cast_vote(self, vote_holder):
+		self.vote_record.replay(vote_holder)
+
+# compact, picklable summary of a parsed program
+# functions: the function keys and their FunctionSummary objects,
+#	     in the iteration order of the parser's functions
+# approximate_dedup: were the seen paths skipped approximately?
+# estimated_false_drops: the expected number of paths wrongly skipped as seen
+class ProgramSummary:
+	# parsed: the parsed program data, after finish has been called
+	def __init__(self, parsed):
+		self.approximate_dedup = parsed.seen.approximate
+		self.estimated_false_drops = parsed.seen.estimated_false_drops
+		self.functions = []
+		for (key, data) in parsed.functions.items():
+			self.functions.append((key, FunctionSummary(data)))
+
 # combined information about parsed file data
 # functions: per-function statistics
 # unnormalized: unnormalized function data
+# pending: the normalized and unnormalized statistics of later programs,
+#	   per function, that are not yet added to functions and unnormalized,
+#	   up to PENDING_LIMIT per function
 # function_unknowns: number of unknown return values per function appearance
 # function_knowns: number of known return values per function appearance
 # votes: the vote holders for each function
@@ -1060,17 +1806,24 @@ class PredictionRow:
 # high_ratio: the number of standard deviations that a high value should be
 #	      above the average
 # vote_ratio: the threshold ratio for the winning votes
+# sketch_capacity: the capacity of the QuantileSketch of the counts of
+#		   each vote holder, or None to keep all the counts
 # error_specs: the generated error specification
 # prediction_rows: prediction about the constraints
+# approximate_dedup: did any program skip seen paths approximately?
+# estimated_false_drops: the expected number of paths wrongly skipped as seen
 class AutoEPExSum:
 	# bin_limit: bin_limit
 	# low_ratio: low_ratio
 	# high_ratio: high_ratio
 	# vote_ratio: vote_ratio
+	# sketch_capacity: sketch_capacity
 	def __init__(self, bin_limit = BIN_LIMIT, low_ratio = THRESHOLD_RATIO, \
-		     high_ratio = THRESHOLD_RATIO, vote_ratio = VOTE_RATIO):
+		     high_ratio = THRESHOLD_RATIO, vote_ratio = VOTE_RATIO, \
+		     sketch_capacity = None):
 		self.functions = {}
 		self.unnormalized = {}
+		self.pending = {}
 		self.function_unknowns = {}
 		self.function_knowns = {}
 		self.votes = {}
@@ -1078,25 +1831,39 @@ class AutoEPExSum:
 		self.low_ratio = low_ratio
 		self.high_ratio = high_ratio
 		self.vote_ratio = vote_ratio
+		self.sketch_capacity = sketch_capacity
 		self.error_specs = None
 		self.prediction_rows = []
+		self.approximate_dedup = False
+		self.estimated_false_drops = 0.0
 	# Add the data for a program,
 	# and calculate and record its votes and normalized path counts.
 	# parsed: the parsed program data
 	def add(self, parsed):
+		self.add_summary(ProgramSummary(parsed))
+	# Add the summarized data for a program.
+	# summary: the ProgramSummary of the program
+	def add_summary(self, summary):
+		if (summary.approximate_dedup):
+			self.approximate_dedup = True
+		self.estimated_false_drops += summary.estimated_false_drops
 		# Get data per function.
-		for (key, data) in parsed.functions.items():
+		for (key, data) in summary.functions:
 			function_name = key[0]
-			stat = data.branch_stat
-			normalized_data = stat.gen_normalized()
-			unnormalized_data = stat.gen_unnormalized()
-			total_count = stat.get_total_count()
+			normalized_data = data.normalized
+			unnormalized_data = data.unnormalized
 			vote_holder = None
 			unknown_count = data.unknown_count
 			known_count = data.known_count
 			if (self.functions.has_key(key)):
-				self.functions[key] += normalized_data
-				self.unnormalized[key] += unnormalized_data
+				if (not self.pending.has_key(key)):
+					self.pending[key] = ([], [])
+				(normalized_pending, unnormalized_pending) = \
+				self.pending[key]
+				normalized_pending.append(normalized_data)
+				unnormalized_pending.append(unnormalized_data)
+				if (len(normalized_pending) >= PENDING_LIMIT):
+					self.add_pending_key(key)
 				self.function_unknowns[key] += unknown_count
 				self.function_knowns[key] += known_count
 				vote_holder = self.votes[key]
@@ -1106,11 +1873,12 @@ class AutoEPExSum:
 				self.function_unknowns[key] = unknown_count
 				self.function_knowns[key] = known_count
 				vote_holder = Vote(function_name, \
-						   stat.type_marker, \
+						   data.type_marker, \
 						   self.bin_limit, \
 						   self.low_ratio, \
 						   self.high_ratio, \
-						   self.vote_ratio)
+						   self.vote_ratio, \
+						   self.sketch_capacity)
 				self.votes[key] = vote_holder
 			data.cast_vote(vote_holder)
 	# Choose a function's error specification
@@ -1157,8 +1925,22 @@ class AutoEPExSum:
 			for result in results:
 				result_vote.count_vote(result, 1)
 			error_specs.add(function, type_marker, result_vote)
+	# Add the pending statistics of a function all at once.
+	# key: the function's key
+	def add_pending_key(self, key):
+		(normalized, unnormalized) = self.pending.pop(key)
+		self.functions[key] = self.functions[key].add_all(normalized)
+		self.unnormalized[key] = self.unnormalized[key] \
+					 .add_all(unnormalized)
+	# Add the pending statistics of each function all at once,
+	# instead of adding each program's statistics to the sum
+	# when the program is added.
+	def add_pending(self):
+		for key in self.pending.keys():
+			self.add_pending_key(key)
 	# Generate the error specifications.
 	def fill_error_specs(self):
+		self.add_pending()
 		# Generate the error specifications using choose_by_normalized.
 		self.error_specs = ErrorSpec()
 		for (key, ratios) in self.functions.items():
@@ -1172,35 +1954,49 @@ class AutoEPExSum:
 		# by voting per program.
 		for vote_value in self.votes.values():
 			vote_value.add_to_spec(self.error_specs)
-	def __str__(self):
+	# Write the summary of all the programs, one section at a time:
+	# the normalized sums, the predictions for each constraint,
+	# and the return error specifications.
+	# stream: the stream to write to
+	def write_to(self, stream):
 		self.fill_error_specs()
-		sorted_pairs = sort_by_key(self.functions)
-		sorted_string = ""
+		if (self.approximate_dedup):
+			stream.write("Approximate path deduplication was used; " + \
+				     "about %f new paths were "%\
+				     (self.estimated_false_drops) + \
+				     "wrongly skipped as seen.\n\n")
 
+		stream.write("Normalized sums:\n")
+		sorted_pairs = sort_by_key(self.functions)
 		for ((function, site), value) in sorted_pairs:
-			sorted_string += "%s:\n%s\n\n"%(function, value)
+			stream.write("%s:\n%s\n\n"%(function, value))
 
-		classification_str = ""
-		for (key, stats) in self.unnormalized.items():
+		stream.write("\nfunction,constraint,prediction,count\n")
+		for (key, stats) in sort_by_key(self.unnormalized):
 			(function, return_type) = key
+			entries = []
 			for (label, count) in stats:
-				if is_undefined(return_type, label):
-					continue
-				prediction = self.error_specs.covers(key, label)
+				if not is_undefined(return_type, label):
+					entries.append((label, count))
+			labels = map(lambda entry: entry[0], entries)
+			predictions = self.error_specs.covers_many(key, labels)
+			for entry_i in range(len(entries)):
+				(label, count) = entries[entry_i]
+				prediction = predictions[entry_i]
 				prediction_row = \
 				PredictionRow(function, return_type, label, \
 					      count, prediction)
 				self.prediction_rows.append(prediction_row)
-				classification_str += \
-				PREDICTION_PREFIX + \
-				"%s,%s,%s,%s\n"%(function, label, prediction, \
-						 count)
+				stream.write(PREDICTION_PREFIX + \
+					     "%s,%s,%s,%s\n"%(function, label, \
+							      prediction, count))
 
-		return "Normalized sums:\n" + sorted_string + \
-		       "\nfunction,constraint,prediction,count\n" + \
-		       classification_str + \
-		       "\nReturn error specifications:\n" + \
-		       str(self.error_specs)
+		stream.write("\nReturn error specifications:\n")
+		self.error_specs.write_to(stream)
+	def __str__(self):
+		stream = StringIO()
+		self.write_to(stream)
+		return stream.getvalue()
 
 if __name__ == "__main__":
 	OUTPUT_I = 1
@@ -1216,7 +2012,7 @@ if __name__ == "__main__":
 
 	if (len(argv) > INPUT_I):
 		input_name = argv[INPUT_I]
-		input_file = open(input_name, "r")
+		input_file = MappedLines(input_name)
 		if (input_file is None):
 			output_file.close()
 			throw_error("Could not open " + input_file + \
@@ -0,0 +1,90 @@
+# compares the allocations and time of adding the call sites of a log
+# to the statistics, and of checking them, by cloning each value
+# with its weight, and by passing the weight separately to ValueStat.update
+from auto_epex_parser import AUTO_EPEX_START, NEW_FILE_MARKER, \
+			     PreCallPath, CallPath
+from follower_counts import FollowerCounts
+from parser_utils import MappedLines
+from ranges import RangeNode, RangeList
+from value_parser import ParsedValue
+from value_stats import initialize_stat
+
+from sys import argv
+from time import time
+
+# the classes whose allocations are counted
+COUNTED_CLASSES = [ParsedValue, RangeList, RangeNode]
+# the number of allocations of each counted class, and its subclasses
+allocations = {}
+
+# Count the allocations of a class, by wrapping its constructor.
+# counted_class: the class
+def count_allocations(counted_class):
+	name = counted_class.__name__
+	original_init = counted_class.__init__
+	allocations[name] = 0
+	def counting_init(self, *args, **kwargs):
+		allocations[name] += 1
+		original_init(self, *args, **kwargs)
+	counted_class.__init__ = counting_init
+
+# Load the call sites of a log.
+# in_name: the path to the log
+# returns the list of the call site segments with data
+def load_callees(in_name):
+	input_file = MappedLines(in_name)
+	callees = []
+	for batch in input_file.prefixed_batches(AUTO_EPEX_START):
+		for line in batch.payloads:
+			if (line.rstrip() == NEW_FILE_MARKER):
+				continue
+			path = CallPath(PreCallPath(line))
+			for callee in path.callees:
+				if (callee.have_data):
+					callee.get_value()
+					callees.append(callee)
+	input_file.close()
+	return callees
+
+# Add the call sites to statistics by function, and check them.
+# callees: the call site segments
+# clone: should the values be cloned with their weights,
+#	 instead of passing the weights separately?
+def add_callees(callees, clone):
+	stats = {}
+	for callee in callees:
+		value = callee.get_value()
+		key = (callee.function, value.type_marker)
+		if (not stats.has_key(key)):
+			stats[key] = initialize_stat(value, True)
+		weight = FollowerCounts([callee.follower_edge])
+		if (clone):
+			stats[key].update(value.clone_new_data(weight))
+			checked = value.clone_new_data(1)
+		else:
+			stats[key].update(value, weight)
+			checked = value
+		checked.have_symbol()
+		checked.is_unknown()
+
+if __name__ == "__main__":
+	IN_I = 1
+
+	if (len(argv) <= IN_I):
+		print "Usage: %s [log file]"%argv[0]
+		exit(-1)
+	callees = load_callees(argv[IN_I])
+	print "Call sites: %d"%(len(callees))
+	for counted_class in COUNTED_CLASSES:
+		count_allocations(counted_class)
+	for (label, clone) in [("Cloned values", True), \
+			       ("Separate weights", False)]:
+		for name in allocations.keys():
+			allocations[name] = 0
+		start = time()
+		add_callees(callees, clone)
+		end = time()
+		print "%s: %f s"%(label, end - start)
+		for name in sorted(allocations.keys()):
+			print "\t%s per call site: %f"%\
+			      (name, float(allocations[name]) / len(callees))
@@ -1,11 +1,15 @@
 # basic application of the error specifications that looks for
 # unchecked function return values
-from auto_epex_parser import AutoEPExParser, ErrorSpec, ERROR_SPEC_PREFIX
+from auto_epex_parser import AutoEPExParser, ErrorSpec, ERROR_SPEC_PREFIX, \
+			     RETAIN_CHECK, lazy_value_counts
 from ranges import OUT_RANGE_DELIM, RangeNode
 from vote import add_polar_vote, init_polar_vote
 from time import time
+from multiprocessing.pool import ThreadPool
 
-from parser_utils import OutputParser
+from parser_utils import OutputParser, MappedLines, \
+			 strip_compressed_suffix
+from columnar_log import open_log
 from value_parser import VOID_TYPE_START, BOOL_TYPE_START, PTR_TYPE_START, \
 			 INT_TYPE_START
 from value_stats import to_label, COVER_OVER, COVER_EXACT, COVER_UNDER, \
@@ -18,6 +22,7 @@ from print_sorted_keys import sort_by_key
 from sys import argv
 from data_utilities import add_to_dict, do_to_dict
 from file_utilities import get_extensionless_name, get_dir
+from option_utilities import parse_options, options_usage
 
 from math import sqrt
 
@@ -233,7 +238,8 @@ class BugsChecker:
 	# For a call site, check all the paths for bugs.
 	# function: the function name
 	# site: the call site
-	# paths: the paths that go through the call site
+	# paths: the facts about the paths that go through the call site,
+	#	 as in auto_epex_parser.get_site_fact
 	# error_spec: the error specification
 	# callee_type: the return value of the callee
 	# returns a SiteReport if there is a potential bug, or None
@@ -249,23 +255,18 @@ class BugsChecker:
 		unchecked_paths =  []
 		# Gather caller information,
 		# and check if the return value is wrapped or checked.
-		for (segment, path) in paths:
-			value = segment.value.clone_new_data(1)
-			caller = path.caller_location
-			wrapped = False
-			if (value.have_symbol()):
-				wrapped = value.same_assignments(path.caller \
-								     .value)
+		for site_fact in paths:
+			(have_symbol, wrapped, unknown, caller) = site_fact
+			if (have_symbol):
 				if (wrapped):
 					sometimes_wrapped = True
 				else:
 					always_wrapped = False
-			if (value.is_unknown()):
+			if (unknown):
 				if (not wrapped):
-					unchecked_paths.append(segment)
+					unchecked_paths.append(site_fact)
 			else:
 				always_unchecked = False
-			path_return_type = path.caller.value.type_marker
 
 		if (always_wrapped is None):
 			always_wrapped = False
@@ -289,7 +290,7 @@ class BugsChecker:
 	def check(self):
 		# Gather the potential bug reports
 		for ((function, callee_type), site_paths) in \
-		    self.auto_epex_data.get_site_paths():
+		    self.auto_epex_data.get_site_facts():
 			error_spec = self.specs.get_spec(function, callee_type)
 			if (error_spec is None):
 				continue
@@ -314,18 +315,59 @@ class BugsChecker:
 
 		return n_reported
 
+# the suffix of the bug report files
+BUGS_SUFFIX = ".bugs"
+
+# Check a single log file, and write its bug reports.
+# job: the output directory, the log path, and the parsed error specification
+# returns the log path, the number of reported bugs, and the elapsed time
+def check_log_job(job):
+	(out_dir, log_in_name, error_spec_parser) = job
+	start = time()
+	bugs_out_name = out_dir + \
+			get_extensionless_name( \
+			strip_compressed_suffix(log_in_name)) + \
+			BUGS_SUFFIX
+
+	log_in_file = open_log(log_in_name)
+	if (log_in_file is None):
+		throw_error("Could not open log file, %s"%log_in_name)
+
+	bugs_out_file = open(bugs_out_name, "w")
+	if (bugs_out_file is None):
+		throw_error("Could not open bugs file, " + \
+			    "%s"%bugs_out_name)
+
+	parsed_data = AutoEPExParser(None, log_in_file, \
+				     retention = RETAIN_CHECK)
+	parsed_data.read_lines()
+	log_in_file.close()
+
+	bugs_checker = BugsChecker(bugs_out_file, parsed_data, \
+				   error_spec_parser)
+	n_reported = bugs_checker.check()
+	bugs_out_file.close()
+	end = time()
+	return (log_in_name, n_reported, end - start)
+
+# option for the number of threads that check the log files
+THREADS_OPTION = "--threads"
+# the default values of the options
+DEFAULT_OPTIONS = {THREADS_OPTION: 1}
+
 if __name__ == "__main__":
 	OUT_I = 1
 	SUMMARY_I = OUT_I + 1
 	PROGRAMS_START = SUMMARY_I + 1
-	BUGS_SUFFIX = ".bugs"
 
-	if (len(argv) <= PROGRAMS_START):
-		throw_error("Usage [output directory] " + \
+	(options, args) = parse_options(argv, DEFAULT_OPTIONS)
+	if (len(args) <= PROGRAMS_START):
+		throw_error("Usage %s [output directory] "%\
+			    (options_usage(DEFAULT_OPTIONS)) + \
 			    "[error specification] [log files]")
 
-	summary_name = argv[SUMMARY_I]
-	summary_file = open(summary_name, "r")
+	summary_name = args[SUMMARY_I]
+	summary_file = MappedLines(summary_name)
 	if (summary_file is None):
 		throw_error("Could not open summary file, %s"%summary_name)
 
@@ -333,33 +375,28 @@ if __name__ == "__main__":
 	error_spec_parser.read_lines()
 	summary_file.close()
 
-	out_dir = argv[OUT_I]
+	out_dir = args[OUT_I]
+	jobs = map(lambda log_in_name: (out_dir, log_in_name, \
+					error_spec_parser), \
+		   args[PROGRAMS_START : ])
+	pool = None
+	if (options[THREADS_OPTION] > 1):
+		# Check the files in threads, with separate parsing state,
+		# but report them in a fixed order.
+		pool = ThreadPool(options[THREADS_OPTION])
+		results = pool.imap(check_log_job, jobs)
+	else:
+		results = (check_log_job(job) for job in jobs)
 	n_reported = 0
-	for log_in_name in argv[PROGRAMS_START : ]:
-		start = time()
-		bugs_out_name = out_dir + \
-				get_extensionless_name(log_in_name) + \
-				BUGS_SUFFIX
-
+	for (log_in_name, n_bugs, elapsed) in results:
 		print "Analyzing " + log_in_name
-		log_in_file = open(log_in_name, "r")
-		if (log_in_file is None):
-			throw_error("Could not open log file, %s"%log_in_name)
-
-		bugs_out_file = open(bugs_out_name, "w")
-		if (bugs_out_file is None):
-			throw_error("Could not open bugs file, " + \
-				    "%s"%bugs_out_name)
-
-		parsed_data = AutoEPExParser(None, log_in_file)
-		parsed_data.read_lines()
-		log_in_file.close()
-
-		bugs_checker = BugsChecker(bugs_out_file, parsed_data, \
-					   error_spec_parser)
-		n_reported += bugs_checker.check()
-		bugs_out_file.close()
-		end = time()
-		print "Elapsed time: %f"%(end - start)
+		n_reported += n_bugs
+		print "Elapsed time: %f"%(elapsed)
+	if (not pool is None):
+		pool.close()
+		pool.join()
 
 	print "Reported %d bugs"%(n_reported)
+	(n_deferred, n_parsed) = lazy_value_counts.get_counts()
+	print "Deferred Value Parses Avoided: %d of %d"%\
+	      (n_deferred - n_parsed, n_deferred)
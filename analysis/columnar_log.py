@@ -0,0 +1,232 @@
+# a compact, columnar file format for the paths of a checker log,
+# so that a log converted once can be loaded again without parsing its text.
+# The function names, locations and values are stored once each,
+# in string tables, and the distinct segments refer to them by id.
+# Each path is stored as the ids of its segments, ending with the caller,
+# the partial counts of the segments, and whether it ended with an exit.
+from array import array
+from struct import pack, unpack, calcsize
+from sys import byteorder
+
+from error_handler import throw_error
+from parser_utils import open_text_log
+
+# marks the start of a columnar log file
+COLUMNAR_MAGIC = "APExCOL1"
+# the suffix of columnar log files
+COLUMNAR_SUFFIX = ".aecol"
+# the header of a columnar log file: the magic and the byte order marker
+FILE_HEADER = "<8sc"
+# the byte order markers
+LITTLE_ENDIAN_MARKER = "l"
+BIG_ENDIAN_MARKER = "b"
+# the header of a column: the array type code, the size of an item,
+# and the number of items
+COLUMN_HEADER = "<cBQ"
+# follows each string in a string table
+STRING_END = "\n"
+
+# the array type codes of the columns
+STRING_TYPE = "c"
+ID_TYPE = "I"
+OFFSET_TYPE = "L"
+COUNT_TYPE = "l"
+FLAG_TYPE = "B"
+
+# Get the byte order marker of this machine.
+# returns the byte order marker
+def get_byte_order_marker():
+	if (byteorder == "little"):
+		return LITTLE_ENDIAN_MARKER
+	return BIG_ENDIAN_MARKER
+
+# assigns consecutive ids to distinct strings
+# ids: maps each string to its id
+# strings: the strings, in the order of their ids
+class StringTable:
+	def __init__(self):
+		self.ids = {}
+		self.strings = []
+	# Get the id of a string, adding it if it is new.
+	# string: the string
+	# returns the id of the string
+	def get_id(self, string):
+		if (self.ids.has_key(string)):
+			return self.ids[string]
+		string_id = len(self.strings)
+		self.ids[string] = string_id
+		self.strings.append(string)
+		return string_id
+	# Generate the column holding the strings.
+	# returns the array of the characters of the strings
+	def to_column(self):
+		return array(STRING_TYPE, \
+			     "".join(map(lambda string: string + STRING_END, \
+					 self.strings)))
+
+# converts the partly-parsed paths of a log into a columnar log file
+# functions: the table of the function names
+# locations: the table of the locations
+# values: the table of the value strings
+# segment_ids: maps the function, location and value ids, and whether
+#	       the segment has data, to the id of the segment
+# segment_functions: the function id of each segment
+# segment_locations: the location id of each segment
+# segment_values: the value id of each segment
+# segment_data: for each segment, 1 if it has data, and 0 otherwise
+# path_starts: the offset in path_segments of each path's first segment,
+#	       followed by the total number of segments
+# path_segments: the segment ids of all the paths, each ending in the caller
+# path_counts: the partial count of each segment in path_segments,
+#	       or 0 for the callers
+# path_exits: for each path, 1 if it ended because of an exit, and 0 otherwise
+# new_files: the number of paths before each NEW FILE marker
+class ColumnarLogWriter:
+	def __init__(self):
+		self.functions = StringTable()
+		self.locations = StringTable()
+		self.values = StringTable()
+		self.segment_ids = {}
+		self.segment_functions = array(ID_TYPE)
+		self.segment_locations = array(ID_TYPE)
+		self.segment_values = array(ID_TYPE)
+		self.segment_data = array(FLAG_TYPE)
+		self.path_starts = array(OFFSET_TYPE, [0])
+		self.path_segments = array(ID_TYPE)
+		self.path_counts = array(COUNT_TYPE)
+		self.path_exits = array(FLAG_TYPE)
+		self.new_files = array(OFFSET_TYPE)
+	# Get the id of a segment, adding it if it is new.
+	# segment: the partly-parsed segment
+	# returns the id of the segment
+	def get_segment_id(self, segment):
+		segment_key = (self.functions.get_id(segment.function), \
+			       self.locations.get_id(segment.location), \
+			       self.values.get_id(segment.value_str), \
+			       len(segment.original) > 0)
+		if (self.segment_ids.has_key(segment_key)):
+			return self.segment_ids[segment_key]
+		segment_id = len(self.segment_functions)
+		self.segment_ids[segment_key] = segment_id
+		(function_id, location_id, value_id, have_data) = segment_key
+		self.segment_functions.append(function_id)
+		self.segment_locations.append(location_id)
+		self.segment_values.append(value_id)
+		self.segment_data.append(int(have_data))
+		return segment_id
+	# Add a path.
+	# pre_path: the partly-parsed path, as an auto_epex_parser.PreCallPath
+	def add_path(self, pre_path):
+		for callee in pre_path.callees:
+			self.path_segments.append(self.get_segment_id(callee))
+			self.path_counts.append(callee.count)
+		self.path_segments.append(self.get_segment_id(pre_path.caller))
+		self.path_counts.append(0)
+		self.path_starts.append(len(self.path_segments))
+		self.path_exits.append(int(pre_path.is_exit))
+	# Add a NEW FILE marker after the paths added so far.
+	def add_new_file(self):
+		self.new_files.append(len(self.path_exits))
+	# Write the columnar log file.
+	# path: the path to the file
+	def write(self, path):
+		columns = [self.functions.to_column(), \
+			   self.locations.to_column(), self.values.to_column(), \
+			   self.segment_functions, self.segment_locations, \
+			   self.segment_values, self.segment_data, \
+			   self.path_starts, self.path_segments, \
+			   self.path_counts, self.path_exits, self.new_files]
+		columnar_file = open(path, "wb")
+		columnar_file.write(pack(FILE_HEADER, COLUMNAR_MAGIC, \
+					 get_byte_order_marker()))
+		for column in columns:
+			columnar_file.write(pack(COLUMN_HEADER, column.typecode, \
+						 column.itemsize, len(column)))
+			column.tofile(columnar_file)
+		columnar_file.close()
+
+# the columns of a columnar log file, as written by ColumnarLogWriter
+# path: the path to the file
+# swap: do the columns have the other byte order?
+# n_paths: the number of paths
+# The string tables are lists of strings,
+# and the other columns have the same names as in ColumnarLogWriter.
+class ColumnarLog:
+	# path: path
+	def __init__(self, path):
+		self.path = path
+		columnar_file = open(path, "rb")
+		header = columnar_file.read(calcsize(FILE_HEADER))
+		if (not is_columnar_header(header)):
+			throw_error("%s is not a columnar log"%path)
+		self.swap = unpack(FILE_HEADER, header)[1] != \
+			    get_byte_order_marker()
+
+		self.functions = self._read_strings(columnar_file, True)
+		self.locations = self._read_strings(columnar_file, True)
+		self.values = self._read_strings(columnar_file, False)
+		self.segment_functions = self._read_column(columnar_file, ID_TYPE)
+		self.segment_locations = self._read_column(columnar_file, ID_TYPE)
+		self.segment_values = self._read_column(columnar_file, ID_TYPE)
+		self.segment_data = self._read_column(columnar_file, FLAG_TYPE)
+		self.path_starts = self._read_column(columnar_file, OFFSET_TYPE)
+		self.path_segments = self._read_column(columnar_file, ID_TYPE)
+		self.path_counts = self._read_column(columnar_file, COUNT_TYPE)
+		self.path_exits = self._read_column(columnar_file, FLAG_TYPE)
+		self.new_files = self._read_column(columnar_file, OFFSET_TYPE)
+		columnar_file.close()
+		self.n_paths = len(self.path_exits)
+	# Read the next column.
+	# columnar_file: the columnar log file
+	# typecode: the expected array type code of the column
+	# returns the array holding the column
+	def _read_column(self, columnar_file, typecode):
+		header = columnar_file.read(calcsize(COLUMN_HEADER))
+		column = array(typecode)
+		if (len(header) < calcsize(COLUMN_HEADER)):
+			throw_error("Columnar log %s is truncated"%self.path)
+		(file_typecode, itemsize, length) = unpack(COLUMN_HEADER, header)
+		if (file_typecode != typecode or itemsize != column.itemsize):
+			throw_error("Columnar log %s has a column of "%self.path + \
+				    "type %s, size %d, "%(file_typecode, itemsize) + \
+				    "instead of type %s, "%typecode + \
+				    "size %d"%column.itemsize)
+		try:
+			column.fromfile(columnar_file, length)
+		except EOFError:
+			throw_error("Columnar log %s is truncated"%self.path)
+		if (self.swap):
+			column.byteswap()
+		return column
+	# Read the next string table.
+	# columnar_file: the columnar log file
+	# should_intern: should the strings be interned,
+	#		 as by auto_epex_parser.PreBasicPathSegment?
+	# returns the list of the strings
+	def _read_strings(self, columnar_file, should_intern):
+		strings = self._read_column(columnar_file, STRING_TYPE) \
+		    .tostring().split(STRING_END)[ : -1]
+		if (should_intern):
+			strings = map(intern, strings)
+		return strings
+	def close(self):
+		return None
+
+# Check if the start of a file is the header of a columnar log.
+# header: the first bytes of the file
+# returns true iff the header starts with the magic of a columnar log
+def is_columnar_header(header):
+	return header[ : len(COLUMNAR_MAGIC)] == COLUMNAR_MAGIC
+
+# Open a log for parsing, whether it is a columnar log, text,
+# or compressed text.
+# path: the path to the log
+# returns the ColumnarLog if the file is a columnar log,
+#	  or else the lines of the text, as in parser_utils.open_text_log
+def open_log(path):
+	log_file = open(path, "rb")
+	header = log_file.read(len(COLUMNAR_MAGIC))
+	log_file.close()
+	if (is_columnar_header(header)):
+		return ColumnarLog(path)
+	return open_text_log(path)
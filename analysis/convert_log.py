@@ -0,0 +1,56 @@
+# converts checker logs into columnar logs,
+# which run_analyses and check_specs can read in place of the text logs
+from auto_epex_parser import AUTO_EPEX_START, NEW_FILE_MARKER, PreCallPath
+from columnar_log import ColumnarLogWriter, COLUMNAR_SUFFIX
+from parser_utils import OutputParser, open_text_log, \
+			 strip_compressed_suffix
+from file_utilities import get_extensionless_name
+
+from sys import argv
+from time import time
+
+# partly parses the paths of a log, and adds them to a columnar log
+# writer: the columnar_log.ColumnarLogWriter
+class ColumnarConverter(OutputParser):
+	# input_handle: the input stream
+	def __init__(self, input_handle):
+		OutputParser.__init__(self, AUTO_EPEX_START, None, input_handle)
+		self.writer = ColumnarLogWriter()
+	# Add a line, which could indicate a new file, or contain a path.
+	# line: the line
+	# returns None
+	def handle_line(self, line):
+		if (line.rstrip() == NEW_FILE_MARKER):
+			self.writer.add_new_file()
+		else:
+			self.writer.add_path(PreCallPath(line))
+		return None
+
+# Convert a log into a columnar log.
+# in_name: the path to the log, which may be compressed
+# out_name: the path to the columnar log to write
+def convert_log(in_name, out_name):
+	input_file = open_text_log(in_name)
+	converter = ColumnarConverter(input_file)
+	converter.read_lines()
+	input_file.close()
+	converter.writer.write(out_name)
+
+if __name__ == "__main__":
+	OUT_DIR_I = 1
+	IN_START = OUT_DIR_I + 1
+
+	if (len(argv) <= IN_START):
+		print "Usage: %s [output directory] [log files...]"%argv[0]
+		exit(-1)
+	out_dir = argv[OUT_DIR_I]
+	for in_name in argv[IN_START : ]:
+		start = time()
+		out_name = out_dir + \
+			   get_extensionless_name( \
+			   strip_compressed_suffix(in_name)) + \
+			   COLUMNAR_SUFFIX
+		print "Converting %s to %s"%(in_name, out_name)
+		convert_log(in_name, out_name)
+		end = time()
+		print "Elapsed Time: %f"%(end - start)
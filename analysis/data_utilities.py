@@ -1,3 +1,5 @@
+from order_stats import exact_stats
+
 def do_to_dict(dictionary, key, new_data, init, increase):
 	if (dictionary.has_key(key)):
 		dictionary[key] = increase(dictionary[key], new_data)
@@ -16,20 +18,16 @@ def or_to_dict(dictionary, key, to_or):
 	else:
 		dictionary[key] = to_or
 
+# counts: a list of counts, which may be reordered,
+#	  or an object that summarizes them, and calculates
+#	  their statistics with get_stats, such as
+#	  order_stats.QuantileSketch or follower_counts.FollowerCounts
+# returns the number of counts, the 5th percentile, the median
+#	  and the 95th percentile, or None if there are no counts
 def counts_to_stats(counts):
-	n_counts = len(counts)
-
-	if (n_counts == 0):
-		return None
-
-	counts.sort()
-	middle = n_counts / 2
-	median = int(counts[middle])
-	if (n_counts % 2 == 0):
-		median = (median + int(counts[middle - 1])) / 2.0
-	lower = int(counts[n_counts / 20])
-	upper = int(counts[n_counts * 19 / 20])
-	return (n_counts, lower, median, upper)
+	if (hasattr(counts, "get_stats")):
+		return counts.get_stats()
+	return exact_stats(counts)
 
 def counts_to_stats_string(counts):
 	stats = counts_to_stats(counts)
@@ -0,0 +1,79 @@
+# storage for the call sites whose statistics are deferred,
+# until the sites are known to not be wrapped, or the file ends.
+# Past a limit, the sites are spilled to a temporary file,
+# so that files with many wrapper functions do not hold them all in memory.
+from cPickle import dump, load, HIGHEST_PROTOCOL
+from tempfile import TemporaryFile
+
+# the default number of deferred sites kept in memory by each parser
+DEFAULT_MAX_DEFERRED = 1 << 16
+
+# the deferred records of call sites, grouped by site key, in the order
+# they were added. The records must be picklable, to be spilled.
+# max_in_memory: the number of records that can be kept in memory
+# records: the lists of records in memory, by site key
+# n_in_memory: the number of records in memory
+# spill_file: the file of the spilled records, or None if none were spilled
+# spilled: the offsets of the spilled lists of records, by site key
+# n_spills: the number of times that the records were spilled
+class DeferredSites:
+	# max_in_memory: max_in_memory
+	def __init__(self, max_in_memory = DEFAULT_MAX_DEFERRED):
+		self.max_in_memory = max(max_in_memory, 1)
+		self.records = {}
+		self.n_in_memory = 0
+		self.spill_file = None
+		self.spilled = {}
+		self.n_spills = 0
+	# Add a record of a site.
+	# site_key: the key of the site
+	# record: the record
+	def add(self, site_key, record):
+		if (self.records.has_key(site_key)):
+			self.records[site_key].append(record)
+		else:
+			self.records[site_key] = [record]
+		self.n_in_memory += 1
+		if (self.n_in_memory >= self.max_in_memory):
+			self._spill()
+	# Move the records in memory to the end of the spill file.
+	def _spill(self):
+		if (self.spill_file is None):
+			self.spill_file = TemporaryFile()
+		self.spill_file.seek(0, 2)
+		for (site_key, site_records) in self.records.iteritems():
+			offset = self.spill_file.tell()
+			dump(site_records, self.spill_file, HIGHEST_PROTOCOL)
+			if (self.spilled.has_key(site_key)):
+				self.spilled[site_key].append(offset)
+			else:
+				self.spilled[site_key] = [offset]
+		self.records = {}
+		self.n_in_memory = 0
+		self.n_spills += 1
+	def has_key(self, site_key):
+		return self.records.has_key(site_key) or \
+		       self.spilled.has_key(site_key)
+	# Remove the records of a site.
+	# site_key: the key of the site
+	# returns the records of the site, in the order they were added
+	def take(self, site_key):
+		site_records = []
+		if (self.spilled.has_key(site_key)):
+			for offset in self.spilled[site_key]:
+				self.spill_file.seek(offset)
+				site_records += load(self.spill_file)
+			del self.spilled[site_key]
+		if (self.records.has_key(site_key)):
+			site_records += self.records[site_key]
+			self.n_in_memory -= len(self.records[site_key])
+			del self.records[site_key]
+		return site_records
+	# Drop all the records, and the spill file.
+	def clear(self):
+		self.records = {}
+		self.n_in_memory = 0
+		self.spilled = {}
+		if (not self.spill_file is None):
+			self.spill_file.close()
+			self.spill_file = None
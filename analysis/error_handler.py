@@ -1,15 +1,45 @@
 from sys import stderr
+from threading import local
 
-history = []
+# the lines shown before an error, eg. the line being parsed.
+# Each parser has its own, so that parsers in different threads
+# do not mix their lines.
+# history: the lines to show
+class ErrorContext:
+	def __init__(self):
+		self.history = []
+	def clear_history(self):
+		del self.history[ : ]
+	def add_line(self, line):
+		self.history.append(line)
+
+# holds the ErrorContext in use by each thread
+contexts = local()
+
+# Get the ErrorContext in use by the current thread.
+# returns the context
+def get_context():
+	context = getattr(contexts, "context", None)
+	if (context is None):
+		context = ErrorContext()
+		contexts.context = context
+	return context
+
+# Use an ErrorContext in the current thread.
+# context: the context to use
+# returns the context that was in use before
+def use_context(context):
+	previous = get_context()
+	contexts.context = context
+	return previous
 
 def clear_history():
-	while (len(history) > 0):
-		del history[-1]
+	get_context().clear_history()
 
 def add_line(line):
-	history.append(line)
+	get_context().add_line(line)
 
 def throw_error(msg):
-	for line in history:
+	for line in get_context().history:
 		stderr.write(str(line) + "\n")
 	raise Exception(msg)
@@ -0,0 +1,113 @@
+# compact counts of the paths that follow a return value constraint,
+# kept by the statistics of FunctionCalls in place of lists of the
+# follower edges, so that the paths themselves are not kept alive
+from types import IntType, ListType, LongType
+
+from order_stats import get_stat_ranks, to_stats
+
+# the counts of the paths following a constraint:
+# how many there are, how many exit with an error,
+# and how many have each length after the call site.
+# Like the lists of follower edges that they replace,
+# they can be added, and added in place, and their length is the number
+# of paths, so the statistics can use either.
+# n_paths: the number of paths
+# n_error_exits: the number of paths that exit because of an error
+# lengths: maps each length after the call site to the number of paths
+class FollowerCounts:
+	# edges: the follower edges of the first paths
+	def __init__(self, edges = []):
+		self.n_paths = 0
+		self.n_error_exits = 0
+		self.lengths = {}
+		for edge in edges:
+			self.add_edge(edge)
+	# Count the path of a follower edge.
+	# edge: the follower edge
+	def add_edge(self, edge):
+		self.n_paths += 1
+		if (edge.path.is_error_exit):
+			self.n_error_exits += 1
+		length = edge.count
+		self.lengths[length] = self.lengths.get(length, 0) + 1
+	def clone(self):
+		clone = FollowerCounts()
+		clone.n_paths = self.n_paths
+		clone.n_error_exits = self.n_error_exits
+		clone.lengths = self.lengths.copy()
+		return clone
+	def __len__(self):
+		return self.n_paths
+	def __iadd__(self, other):
+		other = to_follower_counts(other)
+		self.n_paths += other.n_paths
+		self.n_error_exits += other.n_error_exits
+		lengths = self.lengths
+		for (length, n_paths) in other.lengths.iteritems():
+			lengths[length] = lengths.get(length, 0) + n_paths
+		return self
+	def __add__(self, other):
+		total = self.clone()
+		total += other
+		return total
+	# Add these counts after other, so that a list of follower edges,
+	# or the 0 that sum starts from, can come first.
+	# other: the list of follower edges, or 0
+	# returns the total FollowerCounts
+	def __radd__(self, other):
+		if (other.__class__ == ListType):
+			return FollowerCounts(other) + self
+		if (other == 0 and isinstance(other, (IntType, LongType))):
+			return self.clone()
+		return NotImplemented
+	# Remove the paths counted by other, which must all be counted here.
+	# other: the FollowerCounts to remove
+	# returns the remaining FollowerCounts
+	def __sub__(self, other):
+		remaining = self.clone()
+		remaining.n_paths -= other.n_paths
+		remaining.n_error_exits -= other.n_error_exits
+		lengths = remaining.lengths
+		for (length, n_paths) in other.lengths.iteritems():
+			lengths[length] -= n_paths
+			if (lengths[length] == 0):
+				del lengths[length]
+		return remaining
+	# Calculate the statistics of the lengths after the call site,
+	# as in data_utilities.counts_to_stats.
+	# returns the number of paths, and the 5th percentile, median
+	#	  and 95th percentile of the lengths,
+	#	  or None if there are no paths
+	def get_stats(self):
+		if (self.n_paths == 0):
+			return None
+		ranks = get_stat_ranks(self.n_paths)
+		selected = []
+		rank_i = 0
+		n_below = 0
+		for length in sorted(self.lengths):
+			n_below += self.lengths[length]
+			while (rank_i < len(ranks) and ranks[rank_i] < n_below):
+				selected.append(length)
+				rank_i += 1
+		return to_stats(self.n_paths, selected)
+	def __str__(self):
+		return str(self.n_paths)
+
+# Convert the data of a value or statistic into FollowerCounts.
+# data: the FollowerCounts, or a list of follower edges
+# returns the FollowerCounts
+def to_follower_counts(data):
+	if (data.__class__ == ListType):
+		return FollowerCounts(data)
+	if (not isinstance(data, FollowerCounts)):
+		raise TypeError("cannot count the followers in %s" % \
+				data.__class__.__name__)
+	return data
+
+# Check if the data of a value or statistic counts the following paths,
+# rather than being a plain count.
+# data: the data
+# returns true iff the data is a FollowerCounts, or a list of follower edges
+def counts_followers(data):
+	return isinstance(data, FollowerCounts) or data.__class__ == ListType
@@ -0,0 +1,20 @@
+# reads the function lists used by the checker, eg. analyze_func_list.txt
+
+# marks an exit function entry, rather than an analyzed function
+EXIT_FUNC_MARKER = "0"
+
+# Read the analyzed functions in a function list,
+# in the same way as the checker.
+# path: the path to the function list
+# returns the set of the names of the analyzed functions
+def read_function_list(path):
+	functions = set()
+	list_file = open(path, "r")
+	for line in list_file:
+		if (line.endswith("\n")):
+			line = line[ : -1]
+		if (len(line) == 0 or line[0] == EXIT_FUNC_MARKER):
+			continue
+		functions.add(intern(line))
+	list_file.close()
+	return functions
@@ -0,0 +1,33 @@
+# the prefix marking an option on the command line
+OPTION_PREFIX = "--"
+
+# Pull "--option value" pairs off the front of the command-line arguments.
+# args: the command-line arguments, starting with the program name
+# defaults: maps the known option names to their default values.
+#	    The type of each default value is used to convert the value.
+# returns the option values, and the arguments without the options
+def parse_options(args, defaults):
+	values = dict(defaults)
+	rest = [args[0]]
+	arg_i = 1
+	while (arg_i < len(args) and args[arg_i].startswith(OPTION_PREFIX)):
+		name = args[arg_i]
+		if (not defaults.has_key(name) or arg_i + 1 >= len(args)):
+			print "Unknown option or missing value, %s"%(name)
+			exit(-1)
+		default = defaults[name]
+		value = args[arg_i + 1]
+		if (not default is None):
+			value = default.__class__(value)
+		values[name] = value
+		arg_i += 2
+	return (values, rest + args[arg_i : ])
+
+# Generate the usage string for the options.
+# defaults: maps the known option names to their default values
+# returns the usage string of the options
+def options_usage(defaults):
+	usages = []
+	for name in sorted(defaults.keys()):
+		usages.append("[%s %s]"%(name, defaults[name]))
+	return " ".join(usages)
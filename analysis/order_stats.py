@@ -0,0 +1,168 @@
+# order statistics of counts: the number of counts,
+# and the 5th percentile, median and 95th percentile,
+# either exactly, or approximately from a bounded-size sketch
+try:
+	from numpy import asarray, partition
+except ImportError:
+	asarray = None
+	partition = None
+
+# the smallest number of counts for which NumPy is used to select
+# the order statistics, since converting small lists costs more than sorting
+NUMPY_MIN_COUNTS = 1024
+# the default number of values kept in each level of a QuantileSketch
+DEFAULT_SKETCH_CAPACITY = 256
+
+# Get the ranks of the order statistics of some counts.
+# n_counts: the number of counts
+# returns the ranks of the lower percentile, the two middle counts,
+#	  and the upper percentile.
+#	  The middle ranks are the same if n_counts is odd.
+def get_stat_ranks(n_counts):
+	middle = n_counts / 2
+	lower_middle = middle
+	if (n_counts % 2 == 0):
+		lower_middle = middle - 1
+	return (n_counts / 20, lower_middle, middle, n_counts * 19 / 20)
+
+# Combine the counts at the ranks from get_stat_ranks into the statistics.
+# n_counts: the number of counts
+# selected: the counts at the ranks
+# returns the number of counts, the lower percentile, the median,
+#	  and the upper percentile
+def to_stats(n_counts, selected):
+	(lower, lower_middle, middle, upper) = selected
+	median = int(middle)
+	if (n_counts % 2 == 0):
+		median = (median + int(lower_middle)) / 2.0
+	return (n_counts, int(lower), median, int(upper))
+
+# Check if the counts can be selected by NumPy.
+# counts: the list of counts
+# returns true iff NumPy is available, and the counts are plain numbers
+#	  in a list long enough to be worth converting
+def can_use_numpy(counts):
+	if (partition is None or len(counts) < NUMPY_MIN_COUNTS):
+		return False
+	count_type = type(counts[0])
+	return count_type == int or count_type == long or count_type == float
+
+# Select the counts at some ranks, as if the counts were sorted.
+# With NumPy, the counts are partitioned around the ranks in linear time.
+# Otherwise, the counts are sorted in place, which is still faster
+# than selecting them in pure Python.
+# counts: the list of counts, which can also hold objects
+#	  that are ordered and converted to int by their counts
+# ranks: the ranks to select
+# returns the counts at the ranks, in the same order
+def select_ranks(counts, ranks):
+	if (can_use_numpy(counts)):
+		partitioned = partition(asarray(counts), sorted(set(ranks)))
+		return map(lambda rank: partitioned[rank], ranks)
+	counts.sort()
+	return map(lambda rank: counts[rank], ranks)
+
+# Calculate the exact statistics of counts.
+# counts: the list of counts, which may be reordered
+# returns the number of counts, the lower percentile, the median,
+#	  and the upper percentile, or None if there are no counts
+def exact_stats(counts):
+	n_counts = len(counts)
+	if (n_counts == 0):
+		return None
+	return to_stats(n_counts, select_ranks(counts, \
+					       get_stat_ranks(n_counts)))
+
+# an approximate summary of the order of counts, in bounded memory,
+# that can be merged with summaries of other counts.
+# Like the lists of counts that it replaces, counts can be appended to it,
+# and its length is the number of counts, so the statistics can use either.
+# The counts are kept in levels, where each count in level i stands for
+# 2^i of the appended counts. When a level is full,
+# it is sorted, and every other count is moved to the next level.
+# Until the first level fills, the statistics are exact.
+# capacity: the number of counts that fill a level
+# levels: the lists of counts at each level
+# n_counts: the number of counts appended
+# next_half: which half of a full level is moved next, 0 or 1
+class QuantileSketch:
+	# capacity: capacity
+	def __init__(self, capacity = DEFAULT_SKETCH_CAPACITY):
+		self.capacity = max(capacity, 2)
+		self.levels = [[]]
+		self.n_counts = 0
+		self.next_half = 0
+	def __len__(self):
+		return self.n_counts
+	# Add a count.
+	# count: the count
+	def append(self, count):
+		self.levels[0].append(count)
+		self.n_counts += 1
+		if (len(self.levels[0]) >= self.capacity):
+			self._compact()
+	# Add the counts summarized by another sketch.
+	# other: the other QuantileSketch
+	def merge(self, other):
+		while (len(self.levels) < len(other.levels)):
+			self.levels.append([])
+		for level_i in range(len(other.levels)):
+			self.levels[level_i] += other.levels[level_i]
+		self.n_counts += other.n_counts
+		self._compact()
+	# Halve the full levels into the levels above them.
+	def _compact(self):
+		level_i = 0
+		while (level_i < len(self.levels)):
+			level = self.levels[level_i]
+			if (len(level) >= self.capacity):
+				if (level_i + 1 == len(self.levels)):
+					self.levels.append([])
+				level.sort()
+				# Keep the last count of an odd level,
+				# so that the weights still add up.
+				leftover = []
+				if (len(level) % 2 != 0):
+					leftover = [level.pop()]
+				# Alternate the halves, so that the errors
+				# do not all round the same way,
+				# but the results can be reproduced.
+				self.levels[level_i + 1] += \
+				level[self.next_half : : 2]
+				self.next_half = 1 - self.next_half
+				self.levels[level_i] = leftover
+			level_i += 1
+	# Get the total weight of the counts, which is the number of counts.
+	# returns the total weight
+	def get_weight(self):
+		weight = 0
+		for level_i in range(len(self.levels)):
+			weight += len(self.levels[level_i]) << level_i
+		return weight
+	# Select the approximate counts at some ranks.
+	# ranks: the ranks to select
+	# returns the counts at the ranks, in the same order
+	def select_ranks(self, ranks):
+		weighted = []
+		for level_i in range(len(self.levels)):
+			weight = 1 << level_i
+			for count in self.levels[level_i]:
+				weighted.append((count, weight))
+		weighted.sort()
+
+		selected = []
+		for rank in ranks:
+			total_weight = 0
+			for (count, weight) in weighted:
+				total_weight += weight
+				if (total_weight > rank):
+					break
+			selected.append(count)
+		return selected
+	# Calculate the approximate statistics of the counts.
+	# returns the same statistics as exact_stats, or None if there are none
+	def get_stats(self):
+		if (self.n_counts == 0):
+			return None
+		return to_stats(self.n_counts, \
+				self.select_ranks(get_stat_ranks(self.n_counts)))
@@ -1,6 +1,391 @@
 from sys import stdin
+from mmap import mmap, ACCESS_READ
+from os.path import getsize
+from gzip import GzipFile
+from bz2 import BZ2File
+from threading import Thread
+from Queue import Queue, Full
+try:
+	from lzma import LZMAFile
+except ImportError:
+	LZMAFile = None
 
-from error_handler import clear_history, add_line
+from error_handler import ErrorContext, use_context, throw_error
+
+# the end of a line
+LINE_END = "\n"
+# the number of bytes of a MappedLines range to scan at once
+MAPPED_BLOCK_SIZE = 1 << 24
+# the number of decompressed bytes that CompressedLines reads at once
+COMPRESSED_BLOCK_SIZE = 1 << 20
+# the maximum number of decompressed blocks waiting to be parsed
+COMPRESSED_QUEUE_SIZE = 4
+# the number of seconds between checks for a closed CompressedLines,
+# while its queue is full
+COMPRESSED_PUT_TIMEOUT = 0.1
+# the maximum number of lines in a LineBatch
+LINE_BATCH_SIZE = 4096
+# the number of bytes that a BackgroundWriter collects before writing them
+WRITE_BUFFER_SIZE = 1 << 20
+# the maximum number of buffers waiting to be written by a BackgroundWriter
+WRITE_QUEUE_SIZE = 8
+
+# the line number of a line in a MappedLines range,
+# or in a block of CompressedLines, only counted when it is shown
+# mapping: the memory mapping of the file, or the block
+# start: the offset of the first line in the range
+# offset: the offset of the line
+# first: the line number of the first line in the range
+class MappedLineNumber:
+	def __init__(self, mapping, start, offset, first = 1):
+		self.mapping = mapping
+		self.start = start
+		self.offset = offset
+		self.first = first
+	def __str__(self):
+		return str(self.mapping[self.start : self.offset] \
+			   .count(LINE_END) + self.first)
+
+# a batch of prefixed lines, which is handled at once.
+# While it is handled, it is the error context, showing the current line.
+# payloads: the lines without the prefix and the line end
+# offsets: the line numbers of the lines, if mapping is None,
+#	   or else their offsets in the mapping, relative to base
+# mapping: the memory mapping or block in which the line numbers are counted,
+#	   or None
+# start: the offset of the first line in the mapping
+# base: the offset in the mapping from which the offsets are counted
+# first: the line number of the first line in the mapping
+# index: the index of the line being handled
+class LineBatch:
+	# payloads: payloads
+	# offsets: offsets
+	# mapping: mapping
+	# start: start
+	# base: base
+	# first: first
+	def __init__(self, payloads, offsets, mapping = None, start = 0, \
+		     base = 0, first = 1):
+		self.payloads = payloads
+		self.offsets = offsets
+		self.mapping = mapping
+		self.start = start
+		self.base = base
+		self.first = first
+		self.index = 0
+	# Get the line number of a line.
+	# index: the index of the line
+	# returns the line number, or the MappedLineNumber that counts it
+	def line_number(self, index):
+		if (self.mapping is None):
+			return self.offsets[index]
+		return MappedLineNumber(self.mapping, self.start, \
+					self.base + self.offsets[index], \
+					self.first)
+	# Show the current line, as the line number and the line.
+	def __str__(self):
+		return "%s\n%s"%(self.line_number(self.index), \
+				 self.payloads[self.index])
+
+# Group numbered lines into LineBatch objects of at most LINE_BATCH_SIZE lines.
+# numbered_lines: an iterator over line number and payload pairs
+# returns an iterator over the batches
+def batch_lines(numbered_lines):
+	line_numbers = []
+	payloads = []
+	for (line_number, payload) in numbered_lines:
+		line_numbers.append(line_number)
+		payloads.append(payload)
+		if (len(payloads) == LINE_BATCH_SIZE):
+			yield LineBatch(payloads, line_numbers)
+			line_numbers = []
+			payloads = []
+	if (len(payloads) > 0):
+		yield LineBatch(payloads, line_numbers)
+
+# Find the lines in a block that start with a prefix,
+# without copying the other lines.
+# Each batch is handled before the next is scanned,
+# so that its lines are still cached.
+# block: the text, which starts at the start of a line
+# prefix: the line prefix
+# mapping: the memory mapping or block in which the line numbers are counted
+# start: the offset of the first line in the mapping
+# base: the offset of the block in the mapping
+# first: the line number of the first line in the mapping
+# returns an iterator over the LineBatch objects of the lines
+def block_prefixed_batches(block, prefix, mapping, start = 0, base = 0, \
+			   first = 1):
+	marker = LINE_END + prefix
+	prefix_len = len(prefix)
+	block_len = len(block)
+	offsets = []
+	payloads = []
+	if (block.startswith(prefix)):
+		line_start = 0
+	else:
+		line_start = block.find(marker)
+		if (line_start >= 0):
+			line_start += len(LINE_END)
+	while (line_start >= 0):
+		payload_start = line_start + prefix_len
+		line_end = block.find(LINE_END, payload_start)
+		if (line_end < 0):
+			# The last character is dropped,
+			# as if it were a line end.
+			line_end = block_len - 1
+		offsets.append(line_start)
+		payloads.append(block[payload_start : line_end])
+		if (len(payloads) == LINE_BATCH_SIZE):
+			yield LineBatch(payloads, offsets, mapping, start, base, \
+					first)
+			offsets = []
+			payloads = []
+		line_start = block.find(marker, line_end)
+		if (line_start >= 0):
+			line_start += len(LINE_END)
+	if (len(payloads) > 0):
+		yield LineBatch(payloads, offsets, mapping, start, base, first)
+
+# reads the lines in a byte range of a file through a memory mapping,
+# so that the lines with a given prefix can be found
+# without reading the other lines
+# input_file: the mapped file
+# mapping: the memory mapping of the file, or None if the file is empty
+# start: the offset of the first line in the range
+# end: the offset after the last line in the range
+class MappedLines:
+	# path: the path to the file
+	# start: start
+	# end: end, or None for the end of the file
+	def __init__(self, path, start = 0, end = None):
+		size = getsize(path)
+		if (end is None):
+			end = size
+		self.input_file = open(path, "r")
+		self.mapping = None
+		if (size > 0):
+			self.mapping = mmap(self.input_file.fileno(), 0, \
+					    access = ACCESS_READ)
+		self.start = start
+		self.end = end
+	# Iterate over all the lines in the range.
+	def __iter__(self):
+		if (self.mapping is None):
+			return
+		position = self.start
+		while (position < self.end):
+			line_end = self.mapping.find(LINE_END, position, \
+						     self.end)
+			if (line_end < 0):
+				line_end = self.end - 1
+			yield self.mapping[position : line_end + 1]
+			position = line_end + 1
+	# Iterate over the lines in the range that start with the prefix.
+	# The mapping is scanned in large blocks that end at line ends,
+	# and only the prefixed lines are copied out of each block.
+	# prefix: the line prefix
+	# returns an iterator over the LineBatch objects of the lines
+	def prefixed_batches(self, prefix):
+		if (self.mapping is None):
+			return
+		mapping = self.mapping
+		block_start = self.start
+		while (block_start < self.end):
+			block_end = block_start + MAPPED_BLOCK_SIZE
+			if (block_end >= self.end):
+				block_end = self.end
+			else:
+				line_end = mapping.find(LINE_END, block_end - 1, \
+							self.end)
+				if (line_end < 0):
+					block_end = self.end
+				else:
+					block_end = line_end + 1
+			# Every block starts at the start of a line.
+			block = mapping[block_start : block_end]
+			for batch in block_prefixed_batches(block, prefix, \
+							    mapping, self.start, \
+							    block_start):
+				yield batch
+			block_start = block_end
+	def close(self):
+		if (not self.mapping is None):
+			self.mapping.close()
+		self.input_file.close()
+
+# the suffixes of compressed files, and the classes that decompress them
+COMPRESSED_FILE_CLASSES = {".gz": GzipFile, ".bz2": BZ2File, ".xz": LZMAFile}
+
+# Find the suffix of a compressed file.
+# path: the path to the file
+# returns the suffix, or None if the file is not compressed
+def get_compressed_suffix(path):
+	for suffix in COMPRESSED_FILE_CLASSES.keys():
+		if (path.endswith(suffix)):
+			return suffix
+	return None
+
+# Remove the compression suffix from a path,
+# so that output files are named after the uncompressed file.
+# path: the path to the file
+# returns the path without the suffix
+def strip_compressed_suffix(path):
+	suffix = get_compressed_suffix(path)
+	if (suffix is None):
+		return path
+	return path[ : -len(suffix)]
+
+# reads the lines of a compressed file, which is decompressed
+# on a producer thread, so that decompression overlaps with parsing.
+# The thread passes blocks of whole lines through a bounded queue.
+# path: the path to the file
+# input_file: the decompressing file
+# queue: the queue of the decompressed blocks, and the line numbers
+#	 of their first lines. It ends with None, or an error message.
+# closed: has the reader been closed?
+# producer: the producer thread
+class CompressedLines:
+	# path: path
+	def __init__(self, path):
+		file_class = COMPRESSED_FILE_CLASSES[get_compressed_suffix(path)]
+		if (file_class is None):
+			throw_error("Reading %s needs the lzma module"%path)
+		self.path = path
+		self.input_file = file_class(path, "rb")
+		self.queue = Queue(COMPRESSED_QUEUE_SIZE)
+		self.closed = False
+		self.producer = Thread(target = self._produce)
+		self.producer.daemon = True
+		self.producer.start()
+	# Wait to add an item to the queue, unless the reader is closed.
+	# item: the item to add
+	# returns true iff the item was added
+	def _put(self, item):
+		while (not self.closed):
+			try:
+				self.queue.put(item, True, COMPRESSED_PUT_TIMEOUT)
+				return True
+			except Full:
+				continue
+		return False
+	# Decompress the file into blocks that end at line ends.
+	# This runs on the producer thread.
+	def _produce(self):
+		first_line = 1
+		rest = ""
+		try:
+			while (True):
+				data = self.input_file.read(COMPRESSED_BLOCK_SIZE)
+				if (len(data) == 0):
+					break
+				block_end = data.rfind(LINE_END) + len(LINE_END)
+				if (block_end == 0):
+					rest += data
+					continue
+				block = rest + data[ : block_end]
+				rest = data[block_end : ]
+				if (not self._put((first_line, block))):
+					return
+				first_line += block.count(LINE_END)
+			if (len(rest) > 0 and not self._put((first_line, rest))):
+				return
+		except Exception as error:
+			self._put("Failed to decompress %s, %s"%(self.path, \
+								  error))
+			return
+		self._put(None)
+	# Iterate over the decompressed blocks.
+	# returns an iterator over the line number of the first line
+	#	  of each block, and the block
+	def blocks(self):
+		while (True):
+			item = self.queue.get()
+			if (item is None):
+				return
+			if (isinstance(item, str)):
+				throw_error(item)
+			yield item
+	# Iterate over the lines that start with the prefix,
+	# in the same way as MappedLines.prefixed_batches.
+	# prefix: the line prefix
+	# returns an iterator over the LineBatch objects of the lines
+	def prefixed_batches(self, prefix):
+		for (first_line, block) in self.blocks():
+			for batch in block_prefixed_batches(block, prefix, block, \
+							    first = first_line):
+				yield batch
+	def close(self):
+		self.closed = True
+		self.producer.join()
+		self.input_file.close()
+
+# writes to a file on a writer thread, so that the writes do not stall
+# the thread that produces the output.
+# The strings are collected into large buffers, which are passed to
+# the writer thread through a bounded queue.
+# output_file: the file to write
+# buffer: the strings not yet passed to the writer thread
+# buffer_size: the total length of the strings in buffer
+# queue: the buffers to write, ending with None
+# error: the error from writing the file, or None
+# writer: the writer thread
+class BackgroundWriter:
+	# output_file: output_file
+	def __init__(self, output_file):
+		self.output_file = output_file
+		self.buffer = []
+		self.buffer_size = 0
+		self.queue = Queue(WRITE_QUEUE_SIZE)
+		self.error = None
+		self.writer = Thread(target = self._consume)
+		self.writer.daemon = True
+		self.writer.start()
+	# Write the buffers in the queue. This runs on the writer thread.
+	def _consume(self):
+		while (True):
+			data = self.queue.get()
+			if (data is None):
+				return
+			# Keep taking buffers after an error,
+			# so that the producer never blocks.
+			if (not self.error is None):
+				continue
+			try:
+				self.output_file.write(data)
+			except Exception as error:
+				self.error = error
+	# Pass the buffered strings to the writer thread.
+	def flush(self):
+		if (self.buffer_size > 0):
+			self.queue.put("".join(self.buffer))
+			self.buffer = []
+			self.buffer_size = 0
+	# Write a string.
+	# string: the string
+	def write(self, string):
+		self.buffer.append(string)
+		self.buffer_size += len(string)
+		if (self.buffer_size >= WRITE_BUFFER_SIZE):
+			self.flush()
+	# Finish writing, and close the file.
+	def close(self):
+		self.flush()
+		self.queue.put(None)
+		self.writer.join()
+		self.output_file.close()
+		if (not self.error is None):
+			throw_error("Failed to write %s, %s"%\
+				    (self.output_file.name, self.error))
+
+# Open a text log, which may be compressed.
+# path: the path to the log
+# returns the CompressedLines if the log is compressed,
+#	  or else the MappedLines of the log
+def open_text_log(path):
+	if (get_compressed_suffix(path) is None):
+		return MappedLines(path)
+	return CompressedLines(path)
 
 class OutputParser:
 	def __init__(self, prefix, output_handle, input_handle = stdin):
@@ -8,7 +393,7 @@ class OutputParser:
 		self.prefix_len = len(prefix)
 		self.output_handle = output_handle
 		self.input_handle = input_handle
-		clear_history()
+		self.error_context = ErrorContext()
 	def handle_line(self, line):
 		return None
 	def finish(self):
@@ -16,20 +401,53 @@ class OutputParser:
 	def write(self, string):
 		if (not self.output_handle is None):
 			self.output_handle.write(string)
-	def read_lines(self):
+	# Iterate over the prefixed lines in the input, in batches.
+	# returns an iterator over the LineBatch objects of the lines
+	def prefixed_batches(self):
+		if (isinstance(self.input_handle, MappedLines) or \
+		    isinstance(self.input_handle, CompressedLines)):
+			return self.input_handle.prefixed_batches(self.prefix)
+		return batch_lines(self._stream_lines())
+	# Iterate over the prefixed lines of an input stream.
+	# returns an iterator over line number and payload pairs,
+	#	  where the payload is the line without the prefix
+	#	  and the line end
+	def _stream_lines(self):
 		n_lines = 0
 		for line in self.input_handle:
 			n_lines += 1
 			if (len(line) < self.prefix_len or \
 			     line[ : self.prefix_len] != self.prefix):
 				continue
-			line = line[self.prefix_len : -1]
-			add_line(n_lines)
-			add_line(line)
-			line_result = self.handle_line(line)
+			yield (n_lines, line[self.prefix_len : -1])
+	# Handle a batch of prefixed lines, and write their results.
+	# By default, each line is handled by handle_line.
+	# Subclasses can override it to handle the whole batch at once,
+	# as long as they keep batch.index at the line being handled,
+	# so that errors show it.
+	# batch: the LineBatch
+	def handle_lines(self, batch):
+		payloads = batch.payloads
+		for index in range(len(payloads)):
+			batch.index = index
+			line_result = self.handle_line(payloads[index])
 			if (line_result != None):
 				self.write(line_result + "\n")
-			clear_history()
-		final = self.finish()
-		if (final != None):
-			self.write(final)
+	# Handle all the prefixed lines in the input.
+	# While they are handled, the parser's own error context is used,
+	# so parsers can read in separate threads.
+	# finalize: should the final output be generated and written?
+	#	    Parsers of partial input can skip it, and be merged later.
+	def read_lines(self, finalize = True):
+		previous_context = use_context(self.error_context)
+		try:
+			for batch in self.prefixed_batches():
+				self.error_context.add_line(batch)
+				self.handle_lines(batch)
+				self.error_context.clear_history()
+			if (finalize):
+				final = self.finish()
+				if (final != None):
+					self.write(final)
+		finally:
+			use_context(previous_context)
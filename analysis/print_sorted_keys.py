@@ -1,3 +1,5 @@
+from cStringIO import StringIO
+
 def sort_by_key(keyed_map):
 	sorted_keys = []
 	for key in keyed_map.keys():
@@ -13,15 +15,20 @@ DEFAULT_PREFIX = ""
 DEFAULT_PAIR_SEP = ": "
 DEFAULT_DELIM = "\n"
 
-def sorted_keys_string(keyed_map, prefix = DEFAULT_PREFIX, \
-		       pair_sep = DEFAULT_PAIR_SEP, delim = DEFAULT_DELIM):
-	return_string = ""
+# Write the pairs of a map to a stream, sorted by key, one pair at a time.
+# stream: the stream to write to
+def write_sorted_keys(stream, keyed_map, prefix = DEFAULT_PREFIX, \
+		      pair_sep = DEFAULT_PAIR_SEP, delim = DEFAULT_DELIM):
 	sorted_pairs = sort_by_key(keyed_map)
 
 	for (key, value) in sorted_pairs:
-		return_string += prefix + str(key) + pair_sep + \
-				 str(value) + delim
-	return return_string
+		stream.write(prefix + str(key) + pair_sep + str(value) + delim)
+
+def sorted_keys_string(keyed_map, prefix = DEFAULT_PREFIX, \
+		       pair_sep = DEFAULT_PAIR_SEP, delim = DEFAULT_DELIM):
+	stream = StringIO()
+	write_sorted_keys(stream, keyed_map, prefix, pair_sep, delim)
+	return stream.getvalue()
 
 def print_sorted_keys(keyed_map, prefix = DEFAULT_PREFIX, \
 		      pair_sep = DEFAULT_PAIR_SEP, delim = DEFAULT_DELIM):
@@ -0,0 +1,82 @@
+# searches of the sorted, disjoint bounds of range lists
+# for many query ranges at once,
+# with NumPy's searchsorted when it is available, or bisect otherwise
+from bisect import bisect_left, bisect_right
+try:
+	from numpy import asarray, int64, searchsorted, where
+except ImportError:
+	asarray = None
+	int64 = None
+	searchsorted = None
+	where = None
+
+# the smallest number of query ranges for which NumPy is used,
+# since converting a few queries costs more than bisecting them
+NUMPY_MIN_QUERIES = 64
+
+# Convert bounds into NumPy arrays, if NumPy should search them.
+# bounds_lists: the sequences of bounds, with the queries first
+# returns the arrays, or None if NumPy is missing,
+#	  there are too few queries, or some bound does not fit in an array
+def to_search_arrays(*bounds_lists):
+	if (searchsorted is None or len(bounds_lists[0]) < NUMPY_MIN_QUERIES):
+		return None
+	try:
+		return map(lambda bounds: asarray(bounds, dtype = int64), \
+			   bounds_lists)
+	except OverflowError:
+		return None
+
+# Find the ranges that overlap each query range.
+# leasts: the lower bounds of the ranges, in ascending order
+# mosts: the upper bounds of the ranges
+# query_leasts: the lower bounds of the query ranges
+# query_mosts: the upper bounds of the query ranges
+# returns the lists of the indices of the first overlapping range,
+#	  and of the range after the last overlapping range,
+#	  for each query range
+def search_spans(leasts, mosts, query_leasts, query_mosts):
+	arrays = to_search_arrays(query_leasts, query_mosts, leasts, mosts)
+	if (not arrays is None):
+		(query_leasts, query_mosts, leasts, mosts) = arrays
+		return (searchsorted(mosts, query_leasts, "left").tolist(), \
+			searchsorted(leasts, query_mosts, "right").tolist())
+	firsts = map(lambda least: bisect_left(mosts, least), query_leasts)
+	ends = map(lambda first, most: bisect_right(leasts, most, first), \
+		   firsts, query_mosts)
+	return (firsts, ends)
+
+# Check which query ranges overlap some range.
+# The parameters are the same as for search_spans.
+# returns the list of the truth of the overlap of each query range
+def overlap_flags(leasts, mosts, query_leasts, query_mosts):
+	arrays = to_search_arrays(query_leasts, query_mosts, leasts, mosts)
+	if (not arrays is None):
+		(query_leasts, query_mosts, leasts, mosts) = arrays
+		firsts = searchsorted(mosts, query_leasts, "left")
+		ends = searchsorted(leasts, query_mosts, "right")
+		return (firsts < ends).tolist()
+	(firsts, ends) = search_spans(leasts, mosts, query_leasts, query_mosts)
+	return map(lambda first, end: first < end, firsts, ends)
+
+# Find the range that contains each query range.
+# The parameters are the same as for search_spans.
+# returns the list of the index of the range containing each query range,
+#	  or -1 if no range contains it
+def container_indices(leasts, mosts, query_leasts, query_mosts):
+	if (len(leasts) == 0):
+		return [-1] * len(query_leasts)
+	arrays = to_search_arrays(query_leasts, query_mosts, leasts, mosts)
+	if (not arrays is None):
+		(query_leasts, query_mosts, leasts, mosts) = arrays
+		indices = searchsorted(leasts, query_leasts, "right") - 1
+		contained = (indices >= 0) & \
+			    (mosts[indices.clip(0)] >= query_mosts)
+		return where(contained, indices, -1).tolist()
+	indices = []
+	for query_i in range(len(query_leasts)):
+		range_i = bisect_right(leasts, query_leasts[query_i]) - 1
+		if (range_i < 0 or mosts[range_i] < query_mosts[query_i]):
+			range_i = -1
+		indices.append(range_i)
+	return indices
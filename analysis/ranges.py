@@ -1,12 +1,21 @@
 from error_handler import throw_error
+from follower_counts import FollowerCounts
 from types import ListType
 
+from array import array, ArrayType
+from bisect import bisect_left, bisect_right
+from range_search import search_spans, overlap_flags, container_indices
+
 OUT_RANGE_DELIM = "_"
 OUT_RANGES_DELIM = ","
+# the array type code of the bounds in an ArrayRangeList
+BOUND_TYPE = "l"
 
 def clone_count(count):
 	if (count.__class__ == ListType):
 		return map(lambda x: x, count)
+	elif (isinstance(count, FollowerCounts)):
+		return count.clone()
 	else:
 		return count
 
@@ -182,7 +191,100 @@ class RangeBinder:
 	def __iter__(self):
 		return self.ranges.__iter__()
 
-class RangeList:
+# Get the bounds of query RangeNodes.
+# nodes: the nodes
+# returns the lists of the lower and upper bounds
+def get_query_bounds(nodes):
+	return (map(lambda node: node.least, nodes), \
+		map(lambda node: node.most, nodes))
+
+# the queries shared by RangeList and ArrayRangeList,
+# which search the bounds of all the query ranges at once,
+# using NumPy for many query ranges, if it is available.
+# The lists must also define _get_nodes.
+class RangeQueries:
+	# Check which ranges overlap some range in this list.
+	# nodes: the RangeNodes to check
+	# returns the list of the truth of the overlap of each node
+	def overlaps_many(self, nodes):
+		(leasts, mosts) = get_search_bounds(self)
+		(node_leasts, node_mosts) = get_query_bounds(nodes)
+		return overlap_flags(leasts, mosts, node_leasts, node_mosts)
+	# Check which ranges are contained by a range in this list.
+	# nodes: the RangeNodes to check, or None for the unspecified values
+	# returns the list of the truth of the containment of each node
+	def contains_many(self, nodes):
+		(leasts, mosts) = get_search_bounds(self)
+		known_nodes = filter(lambda node: not node is None, nodes)
+		(node_leasts, node_mosts) = get_query_bounds(known_nodes)
+		indices = container_indices(leasts, mosts, \
+					    node_leasts, node_mosts).__iter__()
+		has_rest = self.has_rest()
+		return map(lambda node: (node is None and has_rest) or \
+				       (not node is None and \
+					indices.next() >= 0), \
+			   nodes)
+	# Find the ranges that overlap each of some ranges.
+	# nodes: the RangeNodes to cover, or None for the unspecified values
+	# returns the list of the overlapping RangeNodes for each node,
+	#	  or [None] for None
+	def get_coverers_many(self, nodes):
+		(leasts, mosts) = get_search_bounds(self)
+		known_nodes = filter(lambda node: not node is None, nodes)
+		(node_leasts, node_mosts) = get_query_bounds(known_nodes)
+		(firsts, ends) = search_spans(leasts, mosts, \
+					      node_leasts, node_mosts)
+		spans = zip(firsts, ends).__iter__()
+		coverers = []
+		for node in nodes:
+			if (node is None):
+				coverers.append([None])
+			else:
+				coverers.append(self._get_nodes(*spans.next()))
+		return coverers
+	def get_coverers(self, node):
+		return self.get_coverers_many([node])[0]
+	def overlaps(self, other):
+		if (self.has_rest() or other.has_rest()):
+			return True
+		(leasts, mosts) = get_search_bounds(self)
+		(other_leasts, other_mosts) = get_search_bounds(other)
+		return True in overlap_flags(leasts, mosts, \
+					     other_leasts, other_mosts)
+	def find_overlaps(self, other):
+		(leasts, mosts, counts) = get_bounds(self)
+		(other_leasts, other_mosts, other_counts) = get_bounds(other)
+		(firsts, ends) = search_spans(leasts, mosts, \
+					      other_leasts, other_mosts)
+		overlaps = []
+		for other_i in range(len(other_counts)):
+			other_count = other_counts[other_i]
+			for range_i in range(firsts[other_i], ends[other_i]):
+				count = counts[range_i]
+				overlap = RangeNode(max(leasts[range_i], \
+							other_leasts[other_i]), \
+						    min(mosts[range_i], \
+							other_mosts[other_i]), \
+						    count)
+				overlap_pair = (clone_count(count), \
+						clone_count(other_count))
+				overlaps.append((overlap, overlap_pair))
+		return overlaps
+	def includes(self, other):
+		(leasts, mosts) = get_search_bounds(self)
+		(other_leasts, other_mosts) = get_search_bounds(other)
+		indices = container_indices(leasts, mosts, \
+					    other_leasts, other_mosts)
+		return len(indices) > 0 and max(indices) >= 0
+	def contains_list(self, other):
+		if (other.has_rest()):
+			return self.has_rest()
+		(leasts, mosts) = get_search_bounds(self)
+		(other_leasts, other_mosts) = get_search_bounds(other)
+		return not -1 in container_indices(leasts, mosts, \
+						   other_leasts, other_mosts)
+
+class RangeList(RangeQueries):
 	def _set_ranges(self, ranges, do_clone):
 		self.ranges = []
 		for range_member in ranges:
@@ -201,12 +303,13 @@ class RangeList:
 				new_member = range_member
 			self.ranges += new_member.flatten()
 		self.need_flatten = False
+		self.search_bounds = None
 	def __init__(self, ranges = [], as_list = False, rest = None):
 		self.as_list = as_list
 		self._set_ranges(ranges, True)
 		if (rest is None):
 			if (as_list):
-				rest = []
+				rest = FollowerCounts()
 			else:
 				rest = 0
 		self.rest = rest
@@ -222,6 +325,33 @@ class RangeList:
 		if (as_list == self.as_list):
 			clone.rest += self.rest
 		return clone
+	# Build a list from ranges that may overlap, or be out of order,
+	# with the same ranges and counts as adding them one at a time.
+	# ranges: the RangeNodes, in the order to add them
+	# as_list: are the counts FollowerCounts, instead of numbers?
+	# returns the new RangeList
+	def from_many(ranges, as_list = False):
+		return RangeList([], as_list) \
+		       ._set_bounds(sweep_ranges(*get_node_bounds(ranges)))
+	from_many = staticmethod(from_many)
+	# Add many lists at once, with the same result as adding them
+	# one at a time to an empty list, but by sweeping all their bounds
+	# together, instead of splitting the ranges on every addition.
+	# range_lists: the RangeLists or ArrayRangeLists, in the order to add
+	# as_list: are the counts FollowerCounts, instead of numbers?
+	# returns the new RangeList
+	def merge_all(range_lists, as_list = False):
+		merged = RangeList([], as_list)
+		return merged._set_bounds(merge_bounds(range_lists, merged))
+	merge_all = staticmethod(merge_all)
+	# Set the ranges from their bounds.
+	# bounds: the lower bounds, upper bounds and counts of the ranges
+	# returns this list
+	def _set_bounds(self, bounds):
+		(leasts, mosts, counts) = bounds
+		self.ranges = map(RangeNode, leasts, mosts, counts)
+		self.search_bounds = None
+		return self
 	def clone_top(self, value = 1, as_list = None):
 		if (as_list is None):
 			as_list = self.as_list
@@ -374,6 +504,7 @@ class RangeList:
 		self.ranges = new_ranges
 
 		self.need_flatten = True
+		self.search_bounds = None
 
 		return add_first
 
@@ -385,6 +516,7 @@ class RangeList:
 		if (len(self.ranges) == 0):
 			temp_clone = new_range_list.clone_flat()
 			self.ranges = temp_clone.ranges
+			self.search_bounds = None
 			self.increment(self.rest)
 			if (new_range_list.has_rest()):
 				self.increment(new_range_list.rest)
@@ -395,6 +527,26 @@ class RangeList:
 		return self
 	def increment(self, to_add = 1):
 		self.rest += to_add
+	def n_ranges(self):
+		self.flatten()
+		return len(self.ranges)
+	def _get_nodes(self, first, end):
+		return self.ranges[first : end]
+	# Get the bounds of the flat ranges, for searching.
+	# They are kept until the ranges change, since lists that are searched
+	# often, like the specifications, rarely change.
+	# returns the lists of the lower and upper bounds
+	def get_search_bounds(self):
+		self.flatten()
+		if (self.search_bounds is None):
+			self.search_bounds = get_query_bounds(self.ranges)
+		return self.search_bounds
+	# Pickle the list without its search bounds,
+	# which can be rebuilt from the ranges.
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["search_bounds"] = None
+		return state
 	def __str__(self):
 		self.flatten()
 		return "Unspecified: %s\n%s"%(str(self.rest), \
@@ -425,13 +577,6 @@ class RangeList:
 			if (child_node.contains(node)):
 				return True
 		return False
-	def contains_list(self, other):
-		if (other.has_rest()):
-			return self.has_rest()
-		for child_node in other.ranges:
-			if (not self.contains(child_node)):
-				return False
-		return True
 	def _overlaps_single(self, other_range, start = 0):
 		new_start = self._search_least(other_range.least, start)
 		new_end = self._search_most(other_range.most, start)
@@ -439,26 +584,6 @@ class RangeList:
 	def overlaps_single(self, other_range):
 		self.flatten()
 		return self._overlaps_single(other_range)[0]
-	def overlaps(self, other):
-		if (self.has_rest() or other.has_rest()):
-			return True
-		self.flatten()
-		other.flatten()
-
-		current_start = 0
-		for other_range in other.ranges:
-			(result, next_start) = \
-			self._overlaps_single(other_range, current_start)
-			if (result):
-				return True
-			elif (next_start >= len(self.ranges)):
-				return False
-			elif (next_start < 0):
-				current_start = 0
-			else:
-				current_start = next_start
-
-		return False
 	def _find_single_overlaps(self, other_range, start = 0):
 		new_start = self._search_least(other_range.least, start)
 		new_end = self._search_most(other_range.most, start)
@@ -476,30 +601,6 @@ class RangeList:
 	def find_single_overlaps(self, other_range):
 		self.flatten()
 		return self._find_single_overlaps(other_range)[0]
-	def find_overlaps(self, other):
-		self.flatten()
-		other.flatten()
-
-		current_start = 0
-		overlaps = []
-		for other_range in other.ranges:
-			(new_overlaps, new_start) = \
-			self._find_single_overlaps(other_range, current_start)
-			current_start = new_start
-			overlaps += new_overlaps
-		return overlaps
-	def get_coverers(self, node):
-		if (node is None):
-			return [None]
-		least_index = self._search_least(node.least, 0)
-		if (least_index < 0):
-			return []
-		most_index = self._search_most(node.most, 0)
-		if (most_index >= len(self.ranges)):
-			return []
-		if (least_index > most_index):
-			return []
-		return self.ranges[least_index : most_index + 1]
 	def is_exactly(self, value):
 		if (self.has_rest()):
 			return False
@@ -517,34 +618,6 @@ class RangeList:
 		if (single_range.least != single_range.most):
 			return None
 		return single_range.least
-	def _includes_single(self, other_range, start = 0):
-		new_start = self._search_least(other_range.least, start)
-		new_end = self._search_most(other_range.most, start)
-
-		does_overlap = False
-		for current_range in self.ranges[new_start : new_end + 1]:
-			if (current_range.contains(other_range)):
-				does_overlap = True
-				break
-
-		return (does_overlap, new_end)
-	def includes(self, other):
-		self.flatten()
-		other.flatten()
-
-		current_start = 0
-		for single_node in other.ranges:
-			(does_overlap, next_start) = \
-			self._includes_single(single_node, current_start)
-			if (does_overlap):
-				return True
-			elif (next_start >= len(self.ranges)):
-				return False
-			elif (next_start < 0):
-				current_start = 0
-			else:
-				current_start = next_start
-		return False
 	def get_most_known(self):
 		if (len(self.ranges) == 0):
 			return None
@@ -554,6 +627,408 @@ class RangeList:
 			return None
 		return self.ranges[0].least
 
+# Convert bounds into the array storage of an ArrayRangeList.
+# bounds: the list of bounds
+# returns the array of the bounds, or a copy of the list,
+#	  if some bound does not fit in the array type
+def to_bound_storage(bounds):
+	try:
+		return array(BOUND_TYPE, bounds)
+	except OverflowError:
+		return list(bounds)
+
+# Get the flat ranges of a RangeList or ArrayRangeList.
+# range_list: the list
+# returns the lists of the lower bounds, upper bounds and counts,
+#	  which must not be modified
+def get_bounds(range_list):
+	if (isinstance(range_list, ArrayRangeList)):
+		return (range_list.leasts, range_list.mosts, range_list.counts)
+	range_list.flatten()
+	leasts = []
+	mosts = []
+	counts = []
+	for node in range_list.ranges:
+		leasts.append(node.least)
+		mosts.append(node.most)
+		counts.append(node.count)
+	return (leasts, mosts, counts)
+
+# Get the bounds of the flat ranges of a RangeList or ArrayRangeList,
+# for searching.
+# range_list: the list
+# returns the lower and upper bounds, which must not be modified
+def get_search_bounds(range_list):
+	if (isinstance(range_list, ArrayRangeList)):
+		return (range_list.leasts, range_list.mosts)
+	return range_list.get_search_bounds()
+
+# Get the bounds of RangeNodes.
+# nodes: the RangeNodes, which are flattened
+# returns the lists of the lower bounds, upper bounds and counts
+def get_node_bounds(nodes):
+	leasts = []
+	mosts = []
+	counts = []
+	for node in nodes:
+		for flat_node in node.flatten():
+			leasts.append(flat_node.least)
+			mosts.append(flat_node.most)
+			counts.append(flat_node.count)
+	return (leasts, mosts, counts)
+
+# Split ranges that may overlap into the ranges that adding them one at a time
+# would produce. The bounds of all the ranges are sorted and swept once:
+# every range starts and ends a new range, and each new range's count
+# is the sum of the counts of the ranges that cover it.
+# The counts are added in the order of the ranges,
+# so that float counts round the same way as when adding one at a time.
+# leasts: the lower bounds of the ranges
+# mosts: the upper bounds of the ranges
+# counts: the counts of the ranges, in the order to add them
+# returns the lists of the lower bounds, upper bounds and counts
+#	  of the new, disjoint ranges, in ascending order
+def sweep_ranges(leasts, mosts, counts):
+	starts = {}
+	ends = {}
+	for range_i in range(len(counts)):
+		starts.setdefault(leasts[range_i], []).append(range_i)
+		ends.setdefault(mosts[range_i] + 1, []).append(range_i)
+	points = sorted(set(starts.keys()).union(ends.keys()))
+
+	new_leasts = []
+	new_mosts = []
+	new_counts = []
+	covering = set()
+	for point_i in range(len(points) - 1):
+		point = points[point_i]
+		covering.difference_update(ends.get(point, []))
+		covering.update(starts.get(point, []))
+		if (len(covering) == 0):
+			continue
+		ordered = sorted(covering)
+		count = clone_count(counts[ordered[0]])
+		for range_i in ordered[1 : ]:
+			count = count + counts[range_i]
+		new_leasts.append(point)
+		new_mosts.append(points[point_i + 1] - 1)
+		new_counts.append(count)
+	return (new_leasts, new_mosts, new_counts)
+
+# Get the bounds of the sum of many lists, as in RangeList.merge_all,
+# and add their unspecified counts to the merged list.
+# range_lists: the lists, in the order to add them
+# merged: the empty list that will hold the sum
+# returns the bounds of the sum, as from sweep_ranges
+def merge_bounds(range_lists, merged):
+	all_leasts = []
+	all_mosts = []
+	all_counts = []
+	have_ranges = False
+	for range_list in range_lists:
+		(leasts, mosts, counts) = get_bounds(range_list)
+		# Follow the additions of the unspecified counts in add.
+		if (len(counts) == 0 and range_list.has_rest()):
+			merged.increment(range_list.rest)
+			continue
+		if (not have_ranges):
+			merged.increment(merged.rest)
+			if (range_list.has_rest()):
+				merged.increment(range_list.rest)
+			have_ranges = len(counts) > 0
+		all_leasts += leasts
+		all_mosts += mosts
+		all_counts += counts
+	return sweep_ranges(all_leasts, all_mosts, all_counts)
+
+# an alternative to RangeList, with the same results,
+# that keeps its flat ranges sorted in parallel arrays,
+# instead of in a list of RangeNodes.
+# Ranges are found by bisecting the bounds in O(log n) time,
+# and added by splicing only the overlapped part of the arrays,
+# without rebuilding the whole list.
+# The counts can be numbers or FollowerCounts, so they stay in a list.
+# Reading the "ranges" field builds new RangeNodes of the ranges,
+# so changing the nodes does not change the list.
+# as_list: are the counts FollowerCounts, instead of numbers?
+# leasts: the lower bounds of the ranges, in ascending order
+# mosts: the upper bounds of the ranges
+# counts: the counts of the ranges
+# rest: the count of the unspecified values
+class ArrayRangeList(RangeQueries):
+	# ranges: the RangeNodes to copy, in ascending order
+	# as_list: as_list
+	# rest: rest, or None for an empty count
+	def __init__(self, ranges = [], as_list = False, rest = None):
+		self.as_list = as_list
+		leasts = []
+		mosts = []
+		self.counts = []
+		for range_member in ranges:
+			if (len(mosts) > 0 and range_member.least <= mosts[-1]):
+				throw_error("Overlapping or out-ouf-order " + \
+					    "ranges, %d%s%d and %s"% \
+					    (leasts[-1], OUT_RANGE_DELIM, \
+					     mosts[-1], range_member))
+			for flat_member in range_member.flatten():
+				leasts.append(flat_member.least)
+				mosts.append(flat_member.most)
+				self.counts.append(flat_member.count)
+		self.leasts = to_bound_storage(leasts)
+		self.mosts = to_bound_storage(mosts)
+		if (rest is None):
+			if (as_list):
+				rest = FollowerCounts()
+			else:
+				rest = 0
+		self.rest = rest
+	def __getattr__(self, name):
+		if (name != "ranges"):
+			raise AttributeError(name)
+		return self._get_nodes(0, len(self.counts))
+	# Build the RangeNodes of some of the ranges.
+	# first: the index of the first range
+	# end: the index after the last range
+	# returns the new RangeNodes
+	def _get_nodes(self, first, end):
+		return map(lambda range_i: RangeNode(self.leasts[range_i], \
+						     self.mosts[range_i], \
+						     self.counts[range_i]), \
+			   range(first, end))
+	def flatten(self):
+		pass
+	def n_ranges(self):
+		return len(self.counts)
+	# Replace some of the ranges.
+	# first: the index of the first range to replace
+	# last: the index after the last range to replace
+	# leasts: the lower bounds of the new ranges
+	# mosts: the upper bounds of the new ranges
+	# counts: the counts of the new ranges
+	def _splice(self, first, last, leasts, mosts, counts):
+		if (isinstance(self.leasts, ArrayType)):
+			try:
+				leasts = array(BOUND_TYPE, leasts)
+				mosts = array(BOUND_TYPE, mosts)
+			except OverflowError:
+				self.leasts = list(self.leasts)
+				self.mosts = list(self.mosts)
+		self.leasts[first : last] = leasts
+		self.mosts[first : last] = mosts
+		self.counts[first : last] = counts
+	# Copy the bounds and counts of another list.
+	# other: the other ArrayRangeList
+	# counts: the counts of the copies
+	def _copy_bounds(self, other, counts):
+		self.leasts = other.leasts[ : ]
+		self.mosts = other.mosts[ : ]
+		self.counts = counts
+	def clone_flat(self, as_list = None):
+		if (as_list is None):
+			as_list = self.as_list
+		clone = ArrayRangeList([], as_list)
+		clone._copy_bounds(self, map(clone_count, self.counts))
+		if (as_list == self.as_list):
+			clone.rest += self.rest
+		return clone
+	# Build a list from ranges, as in RangeList.from_many.
+	# ranges: the RangeNodes, in the order to add them
+	# as_list: are the counts FollowerCounts, instead of numbers?
+	# returns the new ArrayRangeList
+	def from_many(ranges, as_list = False):
+		built = ArrayRangeList([], as_list)
+		built._splice(0, 0, *sweep_ranges(*get_node_bounds(ranges)))
+		return built
+	from_many = staticmethod(from_many)
+	# Add many lists at once, as in RangeList.merge_all.
+	# range_lists: the RangeLists or ArrayRangeLists, in the order to add
+	# as_list: are the counts FollowerCounts, instead of numbers?
+	# returns the new ArrayRangeList
+	def merge_all(range_lists, as_list = False):
+		merged = ArrayRangeList([], as_list)
+		merged._splice(0, 0, *merge_bounds(range_lists, merged))
+		return merged
+	merge_all = staticmethod(merge_all)
+	def clone_top(self, value = 1, as_list = None):
+		if (as_list is None):
+			as_list = self.as_list
+		clone = ArrayRangeList([], as_list)
+		clone._copy_bounds(self, map(lambda count: clone_count(value), \
+					     self.counts))
+		return clone
+	def clone_new_value(self, value, as_list = None):
+		clone = ArrayRangeList([], as_list)
+		clone._copy_bounds(self, [value] * len(self.counts))
+		if (self.has_rest()):
+			clone.rest = value
+		return clone
+	def clone_binder(self):
+		return RangeList(self.ranges).clone_binder()
+	def _gen_number(self, value):
+		count = None
+		if (self.as_list):
+			count = len(value)
+		else:
+			count = value
+		return float(count)
+	def _gen_normal(self, value, base_number):
+		return self._gen_number(value) / base_number
+	def gen_normalized(self, base):
+		base_number = self._gen_number(base)
+		normalized = self.clone_flat(as_list = False)
+		normalized.rest = self._gen_normal(self.rest, base_number)
+		normalized.counts = map(lambda count: \
+					self._gen_normal(count, base_number), \
+					self.counts)
+		return normalized
+	# Add a single range, splitting the ranges that it partly overlaps.
+	# least: the lower bound of the new range
+	# most: the upper bound of the new range
+	# count: the count of the new range
+	# start: the index of the first range that can overlap
+	# returns the index of the first range that can overlap
+	#	  the ranges above the new range
+	def _add(self, least, most, count, start = 0):
+		first = bisect_left(self.mosts, least, start)
+		last = bisect_right(self.leasts, most, first)
+
+		new_leasts = []
+		new_mosts = []
+		new_counts = []
+		next_least = least
+		for range_i in range(first, last):
+			old_least = self.leasts[range_i]
+			old_most = self.mosts[range_i]
+			old_count = self.counts[range_i]
+			if (old_least < least):
+				new_leasts.append(old_least)
+				new_mosts.append(least - 1)
+				new_counts.append(clone_count(old_count))
+				old_least = least
+			if (next_least < old_least):
+				new_leasts.append(next_least)
+				new_mosts.append(old_least - 1)
+				new_counts.append(clone_count(count))
+			overlap_most = min(old_most, most)
+			new_leasts.append(old_least)
+			new_mosts.append(overlap_most)
+			new_counts.append(old_count + count)
+			if (old_most > most):
+				new_leasts.append(most + 1)
+				new_mosts.append(old_most)
+				new_counts.append(clone_count(old_count))
+			next_least = overlap_most + 1
+		if (next_least <= most):
+			new_leasts.append(next_least)
+			new_mosts.append(most)
+			new_counts.append(clone_count(count))
+
+		self._splice(first, last, new_leasts, new_mosts, new_counts)
+		return first + len(new_counts) - 1
+	def add(self, new_range_list):
+		if (new_range_list.n_ranges() == 0 and \
+		    new_range_list.has_rest()):
+			self.increment(new_range_list.rest)
+			return self
+		(leasts, mosts, counts) = get_bounds(new_range_list)
+		if (len(self.counts) == 0):
+			self._splice(0, 0, leasts, mosts, \
+				     map(clone_count, counts))
+			self.increment(self.rest)
+			if (new_range_list.has_rest()):
+				self.increment(new_range_list.rest)
+			return self
+		start = 0
+		for range_i in range(len(counts)):
+			start = self._add(leasts[range_i], mosts[range_i], \
+					  counts[range_i], start)
+		return self
+	def increment(self, to_add = 1):
+		self.rest += to_add
+	def _range_str(self, range_i):
+		return "%d%s%d(%s)"%(self.leasts[range_i], OUT_RANGE_DELIM, \
+				     self.mosts[range_i], self.counts[range_i])
+	def __str__(self):
+		return "Unspecified: %s\n%s"%(str(self.rest), \
+				       OUT_RANGES_DELIM.join(map(self._range_str, \
+							 range(len(self.counts)))))
+	def has_rest(self):
+		if (self.as_list):
+			return len(self.rest) > 0
+		else:
+			return self.rest > 0
+	def short_str(self):
+		nodes_str = OUT_RANGES_DELIM.join(map(lambda node: \
+						      node.short_str(), \
+						      self.ranges))
+		if (self.has_rest()):
+			return "Unspecified: %s %s"%(str(self.rest), nodes_str)
+		else:
+			return nodes_str
+	def __iter__(self):
+		pairs = [(None, clone_count(self.rest))]
+		for node in self.ranges:
+			pairs.append((node, node.get_count()))
+		return pairs.__iter__()
+	# Find the ranges that overlap a range.
+	# node: the range
+	# returns the indices of the first overlapping range,
+	#	  and of the range after the last overlapping range
+	def _search(self, node):
+		first = bisect_left(self.mosts, node.least)
+		return (first, bisect_right(self.leasts, node.most, first))
+	# Find the range that contains a range.
+	# node: the contained range
+	# returns the index of the containing range, or -1 if there is none
+	def _search_container(self, node):
+		range_i = bisect_right(self.leasts, node.least) - 1
+		if (range_i >= 0 and node.most <= self.mosts[range_i]):
+			return range_i
+		return -1
+	def contains(self, node):
+		if (node is None):
+			return self.has_rest()
+		return self._search_container(node) >= 0
+	def overlaps_single(self, other_range):
+		(first, end) = self._search(other_range)
+		return first < end
+	def find_single_overlaps(self, other_range):
+		(first, end) = self._search(other_range)
+		overlaps = []
+		other_count = other_range.get_count()
+		for range_i in range(first, end):
+			old_count = self.counts[range_i]
+			overlap = RangeNode(max(self.leasts[range_i], \
+						other_range.least), \
+					    min(self.mosts[range_i], \
+						other_range.most), \
+					    old_count)
+			overlap_pair = (clone_count(old_count), other_count)
+			overlaps.append((overlap, overlap_pair))
+		return overlaps
+	def is_exactly(self, value):
+		if (self.has_rest()):
+			return False
+		if (len(self.counts) != 1):
+			return False
+		return (self.leasts[0] == value) and (self.mosts[0] == value)
+	def get_exact(self):
+		if (self.has_rest()):
+			return None
+		if (len(self.counts) != 1):
+			return None
+		if (self.leasts[0] != self.mosts[0]):
+			return None
+		return self.leasts[0]
+	def get_most_known(self):
+		if (len(self.counts) == 0):
+			return None
+		return self.mosts[-1]
+	def get_least_known(self):
+		if (len(self.counts) == 0):
+			return None
+		return self.leasts[0]
+
 def generate_smooth(ranges):
 	last_range = None
 	smoothened_ranges = []
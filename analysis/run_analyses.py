@@ -1,10 +1,129 @@
 # a simple script for running multiple analyses of AutoEPExParser,
 # and combining them into AutoEPExSum, and generating an error specification
-from auto_epex_parser import AutoEPExParser, AutoEPExSum, ErrorSpec
+from auto_epex_parser import AutoEPExParser, AutoEPExSum, ErrorSpec, \
+			     ProgramSummary, parse_log_split, \
+			     lazy_value_counts, get_process_counts, \
+			     process_counts_since, add_process_counts, \
+			     BIN_LIMIT, THRESHOLD_RATIO, RETAIN_STATS
 from time import time
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
 from sys import argv, path
 from file_utilities import get_extensionless_name, get_dir
+from option_utilities import parse_options, options_usage
+from parser_utils import MappedLines, BackgroundWriter, strip_compressed_suffix
+from columnar_log import open_log
+from function_list import read_function_list
+from value_parser import value_caches, DEFAULT_VALUE_CACHE_SIZE
+from seen_paths import SEEN_KEYS, SEEN_BLOOM, SEEN_SPILL, SEEN_PATHS_CLASSES, \
+		       DEFAULT_EXPECTED_PATHS, DEFAULT_ERROR_RATE, \
+		       DEFAULT_MEMORY_BUDGET
+from summary_cache import SummaryCache, ResumeJournal, hash_log, \
+			  DEFAULT_CACHE_SIZE
+from deferred_sites import DEFAULT_MAX_DEFERRED
+
+# the modes of the per-path analysis of each log:
+# no file, only the program summary, or every new path and the summary
+DUMP_OFF = "off"
+DUMP_SUMMARY = "summary"
+DUMP_FULL = "full"
+DUMP_MODES = [DUMP_OFF, DUMP_SUMMARY, DUMP_FULL]
+
+# Parse a single log file, and write its per-path analysis.
+# out_dir: the directory in which to write the per-path analysis
+# in_name: path to the input log file to read, which can be a columnar log,
+#	   or compressed
+# n_split_jobs: the number of worker processes that parse parts of the file.
+#		Columnar and compressed logs are not split.
+# seen_mode: how the seen paths are stored, as in seen_paths.init_seen_paths
+# allowlist: the names of the functions to analyze, or None for all functions
+# dump_mode: what to write to the per-path analysis: DUMP_OFF, DUMP_SUMMARY
+#	     or DUMP_FULL
+# max_deferred: the number of deferred call sites kept in memory by each parser
+# returns the AutoEPExParser holding the parsed data
+def analyze_program(out_dir, in_name, n_split_jobs = 1, seen_mode = SEEN_KEYS, \
+		    allowlist = None, dump_mode = DUMP_FULL, \
+		    max_deferred = DEFAULT_MAX_DEFERRED):
+	# Generate the output file for the log file.
+	extensionless = out_dir + \
+			get_extensionless_name(strip_compressed_suffix(in_name))
+	post_out_name = extensionless + ".ae.analysis"
+
+	try:
+		input_file = open_log(in_name)
+	except IOError:
+		print "Could not open %s for input file"%in_name
+		exit(-1)
+
+	post_output_file = None
+	if (dump_mode != DUMP_OFF):
+		try:
+			post_output_file = open(post_out_name, "w")
+		except IOError:
+			print "Could not open " + \
+			      "%s for AutoEPEx output"%post_out_name
+			input_file.close()
+			exit(-1)
+		if (dump_mode == DUMP_FULL):
+			post_output_file = BackgroundWriter(post_output_file)
+	write_paths = dump_mode == DUMP_FULL
+
+	# Parse the log file.
+	# The paths through the call sites are never checked here,
+	# so only their statistics are kept.
+	if (n_split_jobs > 1 and isinstance(input_file, MappedLines)):
+		input_file.close()
+		post_parser = parse_log_split(in_name, post_output_file, \
+					      n_split_jobs, seen_mode = seen_mode, \
+					      allowlist = allowlist, \
+					      write_paths = write_paths, \
+					      retention = RETAIN_STATS, \
+					      max_deferred = max_deferred)
+	else:
+		post_parser = AutoEPExParser(post_output_file, input_file, \
+					     seen_mode = seen_mode, \
+					     allowlist = allowlist, \
+					     write_paths = write_paths, \
+					     retention = RETAIN_STATS, \
+					     max_deferred = max_deferred)
+		post_parser.read_lines()
+		input_file.close()
+	post_parser.seen.close()
+	if (not post_output_file is None):
+		post_output_file.close()
+	return post_parser
+
+# Parse a single log file, possibly in a worker process.
+# job: the output directory, input log path, the number of split jobs,
+#      the mode of the seen paths, the names of the functions to analyze,
+#      or None for all functions, the mode of the per-path analysis,
+#      and the number of deferred call sites kept in memory
+# returns the input log path, the ProgramSummary of the parsed data,
+#	  the elapsed time, and the parsing counters,
+#	  as in auto_epex_parser.process_counts_since
+def analyze_program_job(job):
+	(out_dir, in_name, n_split_jobs, seen_mode, allowlist, dump_mode, \
+	 max_deferred) = job
+	start = time()
+	process_counts = get_process_counts()
+	summary = ProgramSummary(analyze_program(out_dir, in_name, \
+						 n_split_jobs, seen_mode, \
+						 allowlist, dump_mode, \
+						 max_deferred))
+	end = time()
+	return (in_name, summary, end - start, \
+		process_counts_since(process_counts))
+
+# Get the parameters that affect the ProgramSummary of a log,
+# which are part of its key in a SummaryCache.
+# seen_mode: how the seen paths are stored, as in seen_paths.init_seen_paths
+# allowlist: the names of the functions to analyze, or None for all functions
+# returns the parameters
+def summary_parameters(seen_mode, allowlist):
+	if (not allowlist is None):
+		allowlist = sorted(allowlist)
+	return (BIN_LIMIT, THRESHOLD_RATIO, THRESHOLD_RATIO, seen_mode, allowlist)
 
 # Run analyses on all the files, and generate a summary.
 # out_name: path to the output file, which will contain the error specification
@@ -14,64 +133,243 @@ from file_utilities import get_extensionless_name, get_dir
 # high_ratio: the number of standard deviations that a high value should be
 #	      above the average
 # vote_ratio: the threshold ratio for the winning votes
+# n_jobs: the number of worker processes that parse the log files.
+#	  If it is more than 1, each worker returns a ProgramSummary,
+#	  and the summaries are added in the order of in_paths.
+# n_split_jobs: the number of worker processes that parse parts
+#		of each log file. Only used if n_jobs is 1.
+# seen_mode: how the seen paths are stored, as in seen_paths.init_seen_paths
+# allowlist: the names of the functions to analyze, or None for all functions
+# cache_dir: the directory of the SummaryCache of the parsed logs,
+#	     or None to parse every log.
+#	     The completed logs are also recorded in a ResumeJournal
+#	     next to out_name, so that a crashed run can be resumed.
+# cache_size: the maximum total size of the cached summaries, in bytes
+# n_threads: the number of threads that parse the log files.
+#	     Only used if n_jobs and n_split_jobs are 1.
+#	     Like n_jobs, the summaries are added in the order of in_paths.
+# dump_mode: what to write to the per-path analysis of each log,
+#	     as in analyze_program
+# max_deferred: the number of deferred call sites kept in memory by each parser
+# sketch_capacity: the capacity of the order_stats.QuantileSketch
+#		   that approximates the appearance counts of each function,
+#		   or None to keep all the counts
 # returns the AutoEPExSum of the parsed data
-def run_analyses(out_name, in_paths, low_ratio, high_ratio, vote_ratio):
+def run_analyses(out_name, in_paths, low_ratio, high_ratio, vote_ratio, \
+		 n_jobs = 1, n_split_jobs = 1, seen_mode = SEEN_KEYS, \
+		 allowlist = None, cache_dir = None, \
+		 cache_size = DEFAULT_CACHE_SIZE, n_threads = 1, \
+		 dump_mode = DUMP_FULL, max_deferred = DEFAULT_MAX_DEFERRED, \
+		 sketch_capacity = None):
 	parse_sum = AutoEPExSum(low_ratio = low_ratio, \
 				high_ratio = high_ratio, \
-				vote_ratio = vote_ratio)
+				vote_ratio = vote_ratio, \
+				sketch_capacity = sketch_capacity)
 	out_dir = get_dir(out_name)
-	# Parse each file.
-	for in_name in in_paths:
-		start = time()
-		# Generate the output file for the log file.
-		extensionless = out_dir + get_extensionless_name(in_name)
-		post_out_name = extensionless + ".ae.analysis"
-
-		input_file = open(in_name, "r")
-		if (input_file is None):
-			print "Could not open %s for input file"%input_file
-			output_file.close()
-			exit(-1)
 
-		post_output_file = open(post_out_name, "w")
-		if (post_output_file is None):
-			print "Could not open " + \
-			      "%s for AutoEPEx output"%post_out_name
-			output_file.close()
-			exit(-1)
+	# Find the summaries of the unchanged logs.
+	cache = None
+	journal = None
+	content_hashes = []
+	keys = []
+	summaries = []
+	if (not cache_dir is None):
+		cache = SummaryCache(cache_dir, \
+				     summary_parameters(seen_mode, allowlist), \
+				     cache_size)
+		journal = ResumeJournal(out_name + ".journal")
+	for in_name in in_paths:
+		content_hash = None
+		key = None
+		summary = None
+		if (not cache is None):
+			# Rebuild the key from the journaled hash,
+			# since the parameters may differ from the crashed run.
+			content_hash = journal.get_content_hash(in_name)
+			if (content_hash is None):
+				content_hash = hash_log(in_name)
+			key = cache.get_key(content_hash)
+			summary = cache.load(key)
+		content_hashes.append(content_hash)
+		keys.append(key)
+		summaries.append(summary)
 
+	# Parse the other logs.
+	jobs = []
+	for path_i in range(len(in_paths)):
+		if (summaries[path_i] is None):
+			jobs.append((out_dir, in_paths[path_i], n_split_jobs, \
+				     seen_mode, allowlist, dump_mode, \
+				     max_deferred))
+	pool = None
+	if (n_jobs > 1):
+		# Parse the files in parallel,
+		# but add them in a fixed order.
+		pool = Pool(n_jobs)
+		results = pool.imap(analyze_program_job, jobs)
+	elif (n_threads > 1 and n_split_jobs <= 1):
+		# Parse the files in threads, with separate parsing state.
+		pool = ThreadPool(n_threads)
+		results = pool.imap(analyze_program_job, jobs)
+	else:
+		# Parse each file when it is reached.
+		results = (analyze_program_job(job) for job in jobs)
+	for path_i in range(len(in_paths)):
+		in_name = in_paths[path_i]
 		print "Analyzing " + in_name
-
-		print "Postconditions"
-		# Parse the log file.
-		post_parser = AutoEPExParser(post_output_file, input_file)
-		post_parser.read_lines()
-		post_output_file.close()
-		input_file.close()
+		summary = summaries[path_i]
+		if (summary is None):
+			(in_name, summary, elapsed, process_counts) = \
+			results.next()
+			# The counters of this process are already counted.
+			if (n_jobs > 1):
+				add_process_counts(process_counts)
+			if (not cache is None):
+				cache.store(keys[path_i], summary)
+		else:
+			print "Cached Summary"
+			elapsed = 0.0
+		if (not journal is None):
+			journal.record(in_name, content_hashes[path_i])
 		# Add the parsed data to the sum.
-		parse_sum.add(post_parser)
-		end = time()
-		print "Program Elapsed Time: %f"%(end - start)
+		parse_sum.add_summary(summary)
+		if (summary.approximate_dedup):
+			print "Estimated False Drops: %f"%\
+			      (summary.estimated_false_drops)
+		print "Program Elapsed Time: %f"%(elapsed)
+	if (not pool is None):
+		pool.close()
+		pool.join()
 
 	out_file = open(out_name, "w")
 	overall_start = time()
 	# Generate the summary.
-	out_file.write(str(parse_sum))
+	parse_sum.write_to(out_file)
 	overall_end = time()
 	out_file.close()
+	if (parse_sum.approximate_dedup):
+		print "Overall Estimated False Drops: %f"%\
+		      (parse_sum.estimated_false_drops)
 	print "Overall Elapsed Time: %f"%(overall_end - overall_start)
+	print "Value Cache Hits: %d, Misses: %d"%value_caches.get_counts()
+	(n_deferred, n_parsed) = lazy_value_counts.get_counts()
+	print "Deferred Value Parses Avoided: %d of %d"%\
+	      (n_deferred - n_parsed, n_deferred)
+	if (not cache is None):
+		cache.evict()
+		journal.finish()
+		print "Summary Cache Hits: %d, Misses: %d"%\
+		      (cache.hits, cache.misses)
 	return parse_sum
 
 DEFAULT_RATIO = 1.0
 
+# option for the number of worker processes
+JOBS_OPTION = "--jobs"
+# option for the number of worker processes parsing parts of each log file
+SPLIT_JOBS_OPTION = "--split-jobs"
+# option for how the seen paths are stored:
+# keys, digests, table, bloom or spill
+DEDUP_OPTION = "--dedup"
+# option for the number of distinct paths for which bloom is sized
+EXPECTED_PATHS_OPTION = "--expected-paths"
+# option for the target rate at which bloom wrongly skips new paths
+ERROR_RATE_OPTION = "--error-rate"
+# option for the number of bytes of memory that spill keeps digests in
+MEMORY_BUDGET_OPTION = "--memory-budget"
+# option for the maximum number of parsed values to cache, or 0 for none
+VALUE_CACHE_OPTION = "--value-cache"
+# option for a function list, eg. analyze_func_list.txt,
+# of the only functions to analyze
+FUNCTIONS_OPTION = "--functions"
+# option for the directory of the cached summaries of parsed logs
+CACHE_DIR_OPTION = "--cache-dir"
+# option for the maximum total size of the cached summaries, in bytes
+CACHE_SIZE_OPTION = "--cache-size"
+# option for the number of threads that parse the log files
+THREADS_OPTION = "--threads"
+# option for what to write to the per-path analysis of each log:
+# off, summary or full
+DUMP_OPTION = "--dump"
+# option for the number of possibly-wrapped call sites that each parser
+# keeps in memory before spilling them to disk
+MAX_DEFERRED_OPTION = "--max-deferred"
+# option for the capacity of the sketch that approximates
+# the appearance counts of each function across the programs,
+# or 0 to keep all the counts
+STATS_SKETCH_OPTION = "--stats-sketch"
+# the default values of the options
+DEFAULT_OPTIONS = {JOBS_OPTION: 1, SPLIT_JOBS_OPTION: 1, \
+		   DEDUP_OPTION: SEEN_KEYS, \
+		   EXPECTED_PATHS_OPTION: DEFAULT_EXPECTED_PATHS, \
+		   ERROR_RATE_OPTION: DEFAULT_ERROR_RATE, \
+		   MEMORY_BUDGET_OPTION: DEFAULT_MEMORY_BUDGET, \
+		   VALUE_CACHE_OPTION: DEFAULT_VALUE_CACHE_SIZE, \
+		   FUNCTIONS_OPTION: None, CACHE_DIR_OPTION: None, \
+		   CACHE_SIZE_OPTION: DEFAULT_CACHE_SIZE, THREADS_OPTION: 1, \
+		   DUMP_OPTION: DUMP_FULL, \
+		   MAX_DEFERRED_OPTION: DEFAULT_MAX_DEFERRED, \
+		   STATS_SKETCH_OPTION: 0}
+
 if __name__ == "__main__":
 	SUM_OUT_I = 1
 	IN_START = SUM_OUT_I + 1
 
-	if (len(argv) <= IN_START):
+	(options, args) = parse_options(argv, DEFAULT_OPTIONS)
+	if (len(args) <= IN_START):
 		print "Please enter summary output file and input files"
+		print "Usage: %s %s "%(args[0], \
+				       options_usage(DEFAULT_OPTIONS)) + \
+		      "[summary output file] [input files...]"
+		exit(-1)
+	parallel_options = filter(lambda option: options[option] > 1, \
+				  [JOBS_OPTION, SPLIT_JOBS_OPTION, THREADS_OPTION])
+	if (len(parallel_options) > 1):
+		print "%s cannot be combined"%(" and ".join(parallel_options))
 		exit(-1)
+	if (not SEEN_PATHS_CLASSES.has_key(options[DEDUP_OPTION])):
+		print "%s must be one of %s"%(DEDUP_OPTION, \
+					      ", ".join(SEEN_PATHS_CLASSES.keys()))
+		exit(-1)
+	if (not options[DUMP_OPTION] in DUMP_MODES):
+		print "%s must be one of %s"%(DUMP_OPTION, ", ".join(DUMP_MODES))
+		exit(-1)
+	seen_mode = options[DEDUP_OPTION]
+	if (seen_mode == SEEN_BLOOM):
+		if (options[EXPECTED_PATHS_OPTION] <= 0 or \
+		    options[ERROR_RATE_OPTION] <= 0 or \
+		    options[ERROR_RATE_OPTION] >= 1):
+			print "%s must be positive, and %s between 0 and 1"%\
+			      (EXPECTED_PATHS_OPTION, ERROR_RATE_OPTION)
+			exit(-1)
+		seen_mode = (SEEN_BLOOM, options[EXPECTED_PATHS_OPTION], \
+			     options[ERROR_RATE_OPTION])
+	elif (seen_mode == SEEN_SPILL):
+		if (options[MEMORY_BUDGET_OPTION] <= 0):
+			print "%s must be positive"%(MEMORY_BUDGET_OPTION)
+			exit(-1)
+		seen_mode = (SEEN_SPILL, options[MEMORY_BUDGET_OPTION])
+
+	if (options[MAX_DEFERRED_OPTION] <= 0):
+		print "%s must be positive"%(MAX_DEFERRED_OPTION)
+		exit(-1)
+	sketch_capacity = None
+	if (options[STATS_SKETCH_OPTION] < 0):
+		print "%s must not be negative"%(STATS_SKETCH_OPTION)
+		exit(-1)
+	elif (options[STATS_SKETCH_OPTION] > 0):
+		sketch_capacity = options[STATS_SKETCH_OPTION]
+
+	# The worker processes are forked with the resized cache.
+	value_caches.resize(options[VALUE_CACHE_OPTION])
+	allowlist = None
+	if (not options[FUNCTIONS_OPTION] is None):
+		allowlist = read_function_list(options[FUNCTIONS_OPTION])
 
-	out_name = argv[SUM_OUT_I]
-	run_analyses(out_name, argv[IN_START :], DEFAULT_RATIO, DEFAULT_RATIO, \
-		     DEFAULT_RATIO)
+	out_name = args[SUM_OUT_I]
+	run_analyses(out_name, args[IN_START :], DEFAULT_RATIO, DEFAULT_RATIO, \
+		     DEFAULT_RATIO, options[JOBS_OPTION], \
+		     options[SPLIT_JOBS_OPTION], seen_mode, allowlist, \
+		     options[CACHE_DIR_OPTION], options[CACHE_SIZE_OPTION], \
+		     options[THREADS_OPTION], options[DUMP_OPTION], \
+		     options[MAX_DEFERRED_OPTION], sketch_capacity)
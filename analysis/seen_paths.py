@@ -0,0 +1,378 @@
+# sets of the paths that a parser has already seen,
+# used to skip repeated paths
+from struct import unpack_from
+from math import ceil, log
+from mmap import mmap, ACCESS_READ
+from os import close, fdopen, rename
+from os.path import join, dirname, getsize
+from tempfile import mkdtemp, mkstemp
+from shutil import rmtree
+
+from error_handler import throw_error
+
+# identifies the paths by their full keys
+SEEN_KEYS = "keys"
+# identifies the paths by their digests, in a set
+SEEN_DIGESTS = "digests"
+# identifies the paths by their digests, in a flat hash table
+SEEN_DIGEST_TABLE = "table"
+# approximately identifies the paths by their digests, in a Bloom filter
+SEEN_BLOOM = "bloom"
+# identifies the paths by their digests, spilling them to disk
+SEEN_SPILL = "spill"
+
+# the number of bytes in a path digest
+DIGEST_SIZE = 16
+
+# the seen paths, identified by their full keys
+# keys: the keys of the seen paths
+# approximate: can new paths be wrongly reported as seen?
+# estimated_false_drops: the expected number of new paths
+#			 wrongly reported as seen
+class SeenPaths:
+	def __init__(self):
+		self.keys = {}
+		self.approximate = False
+		self.estimated_false_drops = 0.0
+	# Generate the key identifying a path in this set.
+	# pre_path: the partly-parsed path
+	# returns the key of the path
+	def path_key(self, pre_path):
+		return pre_path.get_key()
+	# Record a path as seen.
+	# key: the key of the path
+	def add(self, key):
+		self.keys[key] = 1
+	def __contains__(self, key):
+		return self.keys.has_key(key)
+	def __len__(self):
+		return len(self.keys)
+	def __iter__(self):
+		return self.keys.__iter__()
+	# Release any resources held outside of memory.
+	def close(self):
+		return None
+
+# the seen paths, identified by digests of their keys
+class SeenPathDigests(SeenPaths):
+	def __init__(self):
+		SeenPaths.__init__(self)
+		self.keys = set()
+	def path_key(self, pre_path):
+		return pre_path.get_digest()
+	def add(self, key):
+		self.keys.add(key)
+	def __contains__(self, key):
+		return key in self.keys
+
+# the initial number of slots in a SeenPathDigestTable
+TABLE_START_SIZE = 1 << 16
+# the highest fraction of used slots before a SeenPathDigestTable grows
+TABLE_MAX_LOAD = 0.5
+# the digest marking an empty slot
+EMPTY_DIGEST = "\0" * DIGEST_SIZE
+
+# the seen paths, identified by digests of their keys,
+# and stored in an open-addressing hash table in a flat byte array
+# slots: the digests, DIGEST_SIZE bytes per slot
+# n_slots: the number of slots, which is a power of 2
+# n_used: the number of used slots
+# has_empty: has the digest that marks an empty slot been added?
+class SeenPathDigestTable(SeenPathDigests):
+	# n_slots: n_slots
+	def __init__(self, n_slots = TABLE_START_SIZE):
+		SeenPathDigests.__init__(self)
+		self.keys = None
+		self.slots = bytearray(n_slots * DIGEST_SIZE)
+		self.n_slots = n_slots
+		self.n_used = 0
+		self.has_empty = False
+	# Find the slot of a digest, or the empty slot where it would go.
+	# key: the digest
+	# returns the index of the slot, and whether or not it holds the digest
+	def _find(self, key):
+		mask = self.n_slots - 1
+		slot_i = unpack_from("<Q", key)[0] & mask
+		slots = self.slots
+		while (True):
+			start = slot_i * DIGEST_SIZE
+			slot = slots[start : start + DIGEST_SIZE]
+			if (slot == key):
+				return (slot_i, True)
+			if (slot == EMPTY_DIGEST):
+				return (slot_i, False)
+			slot_i = (slot_i + 1) & mask
+	# Double the number of slots, and reinsert the digests.
+	def _grow(self):
+		old_keys = list(self._used_keys())
+		self.slots = bytearray(self.n_slots * 2 * DIGEST_SIZE)
+		self.n_slots *= 2
+		self.n_used = 0
+		for key in old_keys:
+			self.add(key)
+	def add(self, key):
+		if (key == EMPTY_DIGEST):
+			self.has_empty = True
+			return
+		(slot_i, found) = self._find(key)
+		if (found):
+			return
+		start = slot_i * DIGEST_SIZE
+		self.slots[start : start + DIGEST_SIZE] = key
+		self.n_used += 1
+		if (self.n_used > self.n_slots * TABLE_MAX_LOAD):
+			self._grow()
+	def __contains__(self, key):
+		if (key == EMPTY_DIGEST):
+			return self.has_empty
+		return self._find(key)[1]
+	def __len__(self):
+		if (self.has_empty):
+			return self.n_used + 1
+		return self.n_used
+	# Iterate over the digests in the slots.
+	def _used_keys(self):
+		for slot_i in range(self.n_slots):
+			start = slot_i * DIGEST_SIZE
+			slot = str(self.slots[start : start + DIGEST_SIZE])
+			if (slot != EMPTY_DIGEST):
+				yield slot
+	def __iter__(self):
+		if (self.has_empty):
+			yield EMPTY_DIGEST
+		for key in self._used_keys():
+			yield key
+
+# the default number of distinct paths for which a SeenPathBloom is sized
+DEFAULT_EXPECTED_PATHS = 1 << 20
+# the default rate at which a SeenPathBloom wrongly reports new paths as seen
+DEFAULT_ERROR_RATE = 0.001
+
+# the seen paths, approximately identified by digests of their keys
+# in a Bloom filter, so new paths are sometimes wrongly reported as seen
+# bits: the bits of the filter
+# n_bits: the number of bits
+# n_hashes: the number of bits set for each path
+# n_set: the number of set bits
+# n_added: the number of added paths
+class SeenPathBloom(SeenPathDigests):
+	# expected_count: the expected number of distinct paths
+	# error_rate: the target rate at which new paths are reported as seen
+	#	      once expected_count paths have been added
+	def __init__(self, expected_count = DEFAULT_EXPECTED_PATHS, \
+		     error_rate = DEFAULT_ERROR_RATE):
+		SeenPathDigests.__init__(self)
+		self.keys = None
+		self.approximate = True
+		n_bytes = int(ceil(-expected_count * log(error_rate) / \
+				   (log(2) ** 2) / 8))
+		self.n_bits = max(n_bytes, 1) * 8
+		self.bits = bytearray(self.n_bits / 8)
+		self.n_hashes = max(int(round(float(self.n_bits) / \
+					      expected_count * log(2))), 1)
+		self.n_set = 0
+		self.n_added = 0
+	# Find the bits of a digest, by double hashing its two halves.
+	# key: the digest
+	# returns the indices of the bits
+	def _bit_indices(self, key):
+		(first, second) = unpack_from("<QQ", key)
+		return map(lambda hash_i: (first + hash_i * second) % \
+					  self.n_bits, range(self.n_hashes))
+	# Get the current rate at which new paths are reported as seen.
+	# returns the probability that all the bits of a new path are set
+	def error_rate(self):
+		return (float(self.n_set) / self.n_bits) ** self.n_hashes
+	def add(self, key):
+		for bit_i in self._bit_indices(key):
+			mask = 1 << (bit_i & 7)
+			byte_i = bit_i >> 3
+			if (not self.bits[byte_i] & mask):
+				self.bits[byte_i] |= mask
+				self.n_set += 1
+		self.n_added += 1
+	def __contains__(self, key):
+		for bit_i in self._bit_indices(key):
+			if (not self.bits[bit_i >> 3] & (1 << (bit_i & 7))):
+				# For each new path that is found to be new,
+				# p / (1 - p) new paths are expected to have
+				# been wrongly found to be seen.
+				error_rate = self.error_rate()
+				self.estimated_false_drops += \
+				error_rate / (1.0 - error_rate)
+				return False
+		return True
+	def __len__(self):
+		return self.n_added
+	def __iter__(self):
+		throw_error("The paths in a Bloom filter cannot be listed")
+
+# the default number of bytes of memory that a SeenPathSpill can use
+DEFAULT_MEMORY_BUDGET = 1 << 28
+# the estimated number of bytes used by each digest in a set
+DIGEST_ENTRY_COST = 100
+# the number of bytes of the digest that choose its bucket
+BUCKET_KEY_SIZE = 1
+# the number of bytes of bucket records merged at once
+MERGE_BLOCK_SIZE = DIGEST_SIZE << 16
+
+# a bucket of spilled digests, kept sorted in a file
+# and searched through a memory mapping
+# path: the path to the bucket file
+# input_file: the bucket file, or None if it is empty
+# mapping: the memory mapping of the bucket file, or None if it is empty
+# n_records: the number of digests in the file
+class SpillBucket:
+	# path: path
+	def __init__(self, path):
+		self.path = path
+		self.input_file = None
+		self.mapping = None
+		self.n_records = 0
+	# Check if the bucket holds a digest, by binary search.
+	# key: the digest
+	# returns true iff the digest is in the bucket
+	def __contains__(self, key):
+		low = 0
+		high = self.n_records
+		while (low < high):
+			middle = (low + high) / 2
+			start = middle * DIGEST_SIZE
+			record = self.mapping[start : start + DIGEST_SIZE]
+			if (record == key):
+				return True
+			elif (record < key):
+				low = middle + 1
+			else:
+				high = middle
+		return False
+	# Iterate over the digests in the file, in sorted order.
+	def __iter__(self):
+		for block_start in range(0, self.n_records * DIGEST_SIZE, \
+					 MERGE_BLOCK_SIZE):
+			block = self.mapping[block_start : \
+					     block_start + MERGE_BLOCK_SIZE]
+			for start in range(0, len(block), DIGEST_SIZE):
+				yield block[start : start + DIGEST_SIZE]
+	# Merge new digests into the file, keeping it sorted.
+	# keys: the sorted digests, none of which are already in the file
+	def merge(self, keys):
+		(merged_fd, merged_path) = mkstemp(dir = dirname(self.path))
+		merged_file = fdopen(merged_fd, "wb")
+		key_i = 0
+		n_keys = len(keys)
+		for record in self:
+			while (key_i < n_keys and keys[key_i] < record):
+				merged_file.write(keys[key_i])
+				key_i += 1
+			merged_file.write(record)
+		merged_file.write("".join(keys[key_i : ]))
+		merged_file.close()
+		self.close()
+		rename(merged_path, self.path)
+		self.n_records = getsize(self.path) / DIGEST_SIZE
+		self.input_file = open(self.path, "rb")
+		self.mapping = mmap(self.input_file.fileno(), 0, \
+				    access = ACCESS_READ)
+	def close(self):
+		if (not self.mapping is None):
+			self.mapping.close()
+			self.input_file.close()
+			self.mapping = None
+			self.input_file = None
+
+# the seen paths, identified by digests of their keys,
+# that are kept in memory until the memory budget runs out,
+# and are then moved into sorted bucket files on disk
+# memory_budget: the number of bytes of memory that the digests can use
+# max_in_memory: the number of digests that can be kept in memory
+# directory: the directory holding the bucket files
+# buckets: the buckets of the spilled digests,
+#	   indexed by the first bytes of the digests
+# n_spilled: the number of spilled digests
+# n_spills: the number of times that the digests were spilled
+class SeenPathSpill(SeenPathDigests):
+	# memory_budget: memory_budget
+	# parent_directory: the directory in which to create the bucket files,
+	#		    or None for the default temporary directory
+	def __init__(self, memory_budget = DEFAULT_MEMORY_BUDGET, \
+		     parent_directory = None):
+		SeenPathDigests.__init__(self)
+		self.memory_budget = memory_budget
+		self.max_in_memory = max(memory_budget / DIGEST_ENTRY_COST, 1)
+		self.directory = None
+		self.parent_directory = parent_directory
+		self.buckets = []
+		self.n_spilled = 0
+		self.n_spills = 0
+	# Find the bucket of a digest.
+	# key: the digest
+	# returns the index of the bucket for the digest
+	def _bucket_index(self, key):
+		bucket_i = 0
+		for key_byte in key[ : BUCKET_KEY_SIZE]:
+			bucket_i = (bucket_i << 8) | ord(key_byte)
+		return bucket_i
+	# Move the digests in memory into the bucket files.
+	def _spill(self):
+		if (self.directory is None):
+			self.directory = mkdtemp(dir = self.parent_directory)
+			for bucket_i in range(1 << (8 * BUCKET_KEY_SIZE)):
+				bucket_path = join(self.directory, \
+						   "%d.seen"%(bucket_i))
+				self.buckets.append(SpillBucket(bucket_path))
+		bucket_keys = map(lambda bucket: [], self.buckets)
+		for key in sorted(self.keys):
+			bucket_keys[self._bucket_index(key)].append(key)
+		self.keys = set()
+		for bucket_i in range(len(self.buckets)):
+			if (len(bucket_keys[bucket_i]) > 0):
+				self.buckets[bucket_i].merge(bucket_keys[bucket_i])
+		self.n_spilled = sum(map(lambda bucket: bucket.n_records, \
+					 self.buckets))
+		self.n_spills += 1
+	def add(self, key):
+		self.keys.add(key)
+		if (len(self.keys) >= self.max_in_memory):
+			self._spill()
+	def __contains__(self, key):
+		if (key in self.keys):
+			return True
+		if (self.n_spilled == 0):
+			return False
+		return key in self.buckets[self._bucket_index(key)]
+	def __len__(self):
+		return len(self.keys) + self.n_spilled
+	def __iter__(self):
+		for key in self.keys:
+			yield key
+		for bucket in self.buckets:
+			for key in bucket:
+				yield key
+	def close(self):
+		for bucket in self.buckets:
+			bucket.close()
+		if (not self.directory is None):
+			rmtree(self.directory)
+			self.directory = None
+		self.buckets = []
+		self.n_spilled = 0
+
+# the seen path set classes, by mode
+SEEN_PATHS_CLASSES = {SEEN_KEYS: SeenPaths, SEEN_DIGESTS: SeenPathDigests, \
+		      SEEN_DIGEST_TABLE: SeenPathDigestTable, \
+		      SEEN_BLOOM: SeenPathBloom, SEEN_SPILL: SeenPathSpill}
+
+# Initialize an empty set of seen paths.
+# mode: SEEN_KEYS, SEEN_DIGESTS, SEEN_DIGEST_TABLE, SEEN_BLOOM or SEEN_SPILL,
+#	or a tuple of the mode and the arguments for its class,
+#	eg. (SEEN_BLOOM, expected_count, error_rate)
+# returns the empty set of seen paths
+def init_seen_paths(mode = SEEN_KEYS):
+	arguments = ()
+	if (isinstance(mode, tuple)):
+		arguments = mode[1 : ]
+		mode = mode[0]
+	if (not SEEN_PATHS_CLASSES.has_key(mode)):
+		throw_error("Unknown seen path mode, %s"%(mode))
+	return SEEN_PATHS_CLASSES[mode](*arguments)
@@ -0,0 +1,165 @@
+# an on-disk cache of the summaries of parsed programs,
+# so that unchanged logs do not need to be parsed again
+from cPickle import dump, load, HIGHEST_PROTOCOL
+from hashlib import sha1
+from os import listdir, makedirs, remove, rename, stat, utime, fdopen
+from os.path import join, isdir, exists
+from tempfile import mkstemp
+
+# the number of bytes of a log to hash at once
+HASH_BLOCK_SIZE = 1 << 20
+# the suffix of the cached summary files
+SUMMARY_SUFFIX = ".summary"
+# the default maximum total size of the cached summaries
+DEFAULT_CACHE_SIZE = 1 << 30
+# the version of the summary format, which is part of the key,
+# so that summaries from older versions are not used
+SUMMARY_VERSION = 1
+# separates the fields of a journal entry
+JOURNAL_DELIM = "\t"
+
+# Hash the contents of a log file.
+# path: the path to the log file
+# returns the hex digest of the contents
+def hash_log(path):
+	digest = sha1()
+	log_file = open(path, "rb")
+	while (True):
+		block = log_file.read(HASH_BLOCK_SIZE)
+		if (len(block) == 0):
+			break
+		digest.update(block)
+	log_file.close()
+	return digest.hexdigest()
+
+# Get the size and modification time of a file,
+# which identify an unchanged file in the journal.
+# path: the path to the file
+# returns the size and modification time, as strings
+def file_stamp(path):
+	path_stat = stat(path)
+	return (str(path_stat.st_size), repr(path_stat.st_mtime))
+
+# cache of ProgramSummary objects in a directory,
+# keyed by the hash of the log contents and the parser parameters.
+# When it grows too large, the least recently used summaries are removed.
+# directory: the directory holding the cached summaries
+# max_size: the maximum total size of the cached summaries, in bytes
+# parameters_key: the key part of the parser parameters
+# hits: the number of summaries found in the cache
+# misses: the number of summaries not found in the cache
+class SummaryCache:
+	# directory: directory
+	# parameters: the parser parameters that affect the summaries
+	# max_size: max_size
+	def __init__(self, directory, parameters, \
+		     max_size = DEFAULT_CACHE_SIZE):
+		if (not isdir(directory)):
+			makedirs(directory)
+		self.directory = directory
+		self.max_size = max_size
+		self.parameters_key = sha1(repr((SUMMARY_VERSION, \
+						 parameters))).hexdigest()
+		self.hits = 0
+		self.misses = 0
+	# Generate the key of a log.
+	# content_hash: the hash of the log contents, from hash_log
+	# returns the key of the log's summary
+	def get_key(self, content_hash):
+		return content_hash + "-" + self.parameters_key
+	# Get the path of a cached summary.
+	# key: the key of the summary
+	# returns the path to the summary file
+	def _path(self, key):
+		return join(self.directory, key + SUMMARY_SUFFIX)
+	# Load a cached summary, and mark it as recently used.
+	# key: the key of the summary
+	# returns the ProgramSummary, or None if it is not cached
+	def load(self, key):
+		summary_path = self._path(key)
+		if (not exists(summary_path)):
+			self.misses += 1
+			return None
+		summary_file = open(summary_path, "rb")
+		summary = load(summary_file)
+		summary_file.close()
+		utime(summary_path, None)
+		self.hits += 1
+		return summary
+	# Store a summary. It is written to a temporary file first,
+	# so that a crash never leaves a partial summary in the cache.
+	# key: the key of the summary
+	# summary: the ProgramSummary
+	def store(self, key, summary):
+		(temp_fd, temp_path) = mkstemp(dir = self.directory)
+		temp_file = fdopen(temp_fd, "wb")
+		dump(summary, temp_file, HIGHEST_PROTOCOL)
+		temp_file.close()
+		rename(temp_path, self._path(key))
+	# Remove the least recently used summaries,
+	# until the total size is within max_size.
+	def evict(self):
+		entries = []
+		total_size = 0
+		for name in listdir(self.directory):
+			if (not name.endswith(SUMMARY_SUFFIX)):
+				continue
+			entry_path = join(self.directory, name)
+			entry_stat = stat(entry_path)
+			entries.append((entry_stat.st_mtime, entry_path, \
+					entry_stat.st_size))
+			total_size += entry_stat.st_size
+		entries.sort()
+		for (mtime, entry_path, size) in entries:
+			if (total_size <= self.max_size):
+				break
+			remove(entry_path)
+			total_size -= size
+
+# the record of the programs completed in a run, so that a crashed run
+# can resume without hashing the completed logs again
+# path: the path to the journal file
+# completed: maps the completed log paths to their stamps and content hashes.
+#	     Only the content hashes are kept, so that a run with other
+#	     parameters does not reuse the summaries of the crashed run.
+# journal_file: the journal file, opened for appending
+class ResumeJournal:
+	# path: path
+	def __init__(self, path):
+		self.path = path
+		self.completed = {}
+		if (exists(path)):
+			journal_file = open(path, "r")
+			for line in journal_file:
+				# Ignore a line cut off by a crash.
+				if (not line.endswith("\n")):
+					continue
+				(content_hash, size, mtime, log_path) = \
+				line[ : -1].split(JOURNAL_DELIM, 3)
+				self.completed[log_path] = ((size, mtime), \
+							    content_hash)
+			journal_file.close()
+		self.journal_file = open(path, "a")
+	# Get the content hash of a log completed in the crashed run.
+	# log_path: the path to the log
+	# returns the hash, or None if the log was not completed or has changed
+	def get_content_hash(self, log_path):
+		if (not self.completed.has_key(log_path)):
+			return None
+		(stamp, content_hash) = self.completed[log_path]
+		if (stamp != file_stamp(log_path)):
+			return None
+		return content_hash
+	# Record that a log was completed.
+	# log_path: the path to the log
+	# content_hash: the hash of the log's contents
+	def record(self, log_path, content_hash):
+		(size, mtime) = file_stamp(log_path)
+		self.journal_file.write(JOURNAL_DELIM.join([content_hash, size, \
+							    mtime, log_path]) + \
+					"\n")
+		self.journal_file.flush()
+	# Remove the journal after the run is complete.
+	def finish(self):
+		self.journal_file.close()
+		remove(self.path)
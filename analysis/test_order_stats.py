@@ -0,0 +1,118 @@
+from random import randint, random, seed, shuffle
+
+from order_stats import exact_stats, can_use_numpy, NUMPY_MIN_COUNTS, \
+			QuantileSketch
+
+# the statistics calculated by sorting all of the counts
+def sorted_stats(counts):
+	n_counts = len(counts)
+	if (n_counts == 0):
+		return None
+	counts = sorted(counts)
+	middle = n_counts / 2
+	median = int(counts[middle])
+	if (n_counts % 2 == 0):
+		median = (median + int(counts[middle - 1])) / 2.0
+	lower = int(counts[n_counts / 20])
+	upper = int(counts[n_counts * 19 / 20])
+	return (n_counts, lower, median, upper)
+
+def check_stats(message, counts):
+	print message
+	expected = sorted_stats(counts)
+	real = exact_stats(list(counts))
+	if (expected != real):
+		print "Expected %s, but got %s"%(str(expected), str(real))
+		exit(-1)
+	print "\tPassed!"
+
+seed(0)
+SIZES = [0, 1, 2, 3, 19, 20, 21, 40, NUMPY_MIN_COUNTS - 1, \
+	 NUMPY_MIN_COUNTS, NUMPY_MIN_COUNTS + 1, 5000]
+
+for n_counts in SIZES:
+	check_stats("Statistics of %d integers"%n_counts, \
+		    map(lambda _: randint(-50, 50), range(n_counts)))
+	check_stats("Statistics of %d long integers"%n_counts, \
+		    map(lambda _: randint(0, 1 << 40) << 30, range(n_counts)))
+	check_stats("Statistics of %d floats"%n_counts, \
+		    map(lambda _: random() * 100 - 50, range(n_counts)))
+	check_stats("Statistics of %d equal counts"%n_counts, [7] * n_counts)
+
+def to_sketch(counts, capacity):
+	sketch = QuantileSketch(capacity)
+	for count in counts:
+		sketch.append(count)
+	return sketch
+
+def check_weight(sketch):
+	if (sketch.get_weight() != len(sketch)):
+		print "Sketch weighs %d, but has %d counts"%(sketch.get_weight(), \
+							     len(sketch))
+		exit(-1)
+
+# Check that the approximate statistics are within some ranks of the counts.
+# counts: the sorted counts
+# stats: the approximate statistics
+# max_error: the greatest allowed distance in ranks
+def check_close(counts, stats, max_error):
+	(n_counts, lower, median, upper) = stats
+	if (n_counts != len(counts)):
+		print "Expected %d counts, but got %d"%(len(counts), n_counts)
+		exit(-1)
+	(real_n_counts, real_lower, real_median, real_upper) = \
+	sorted_stats(counts)
+	for (estimate, real) in [(lower, real_lower), (median, real_median), \
+				 (upper, real_upper)]:
+		if (abs(counts.index(int(estimate)) - \
+			counts.index(int(real))) > max_error):
+			print "Estimated %s for %s"%(str(estimate), str(real))
+			exit(-1)
+
+print "Sketch of fewer counts than its capacity"
+COUNTS = map(lambda _: randint(-50, 50), range(100))
+SKETCH = to_sketch(COUNTS, 128)
+if (SKETCH.get_stats() != sorted_stats(COUNTS)):
+	print "Expected %s, but got %s"%(str(sorted_stats(COUNTS)), \
+					 str(SKETCH.get_stats()))
+	exit(-1)
+check_weight(SKETCH)
+print "\tPassed!"
+
+print "Sketch of an empty list"
+if (not QuantileSketch().get_stats() is None):
+	print "Expected no statistics"
+	exit(-1)
+print "\tPassed!"
+
+# an odd capacity, so that the full levels have leftover counts
+for capacity in [65, 64]:
+	print "Sketch of many counts, with capacity %d"%capacity
+	COUNTS = range(10000)
+	SHUFFLED = list(COUNTS)
+	shuffle(SHUFFLED)
+	SKETCH = to_sketch(SHUFFLED, capacity)
+	check_weight(SKETCH)
+	if (max(map(len, SKETCH.levels)) >= capacity):
+		print "A level is not compacted"
+		exit(-1)
+	check_close(COUNTS, SKETCH.get_stats(), len(COUNTS) / 10)
+	print "\tPassed!"
+
+print "Merging sketches"
+COUNTS = range(3000)
+SHUFFLED = list(COUNTS)
+shuffle(SHUFFLED)
+MERGED = to_sketch(SHUFFLED[ : 2500], 64)
+MERGED.merge(to_sketch(SHUFFLED[2500 : ], 64))
+check_weight(MERGED)
+check_close(COUNTS, MERGED.get_stats(), len(COUNTS) / 10)
+SMALL = to_sketch([3, 1], 8)
+SMALL.merge(to_sketch([2], 8))
+if (SMALL.get_stats() != sorted_stats([1, 2, 3])):
+	print "Merged small sketches not exact"
+	exit(-1)
+print "\tPassed!"
+
+print "NumPy is %s"%(can_use_numpy([0] * NUMPY_MIN_COUNTS) and "used" or \
+		     "not used")
@@ -0,0 +1,51 @@
+from cStringIO import StringIO
+
+from auto_epex_parser import AutoEPExParser, AutoEPExSum, PREDICTION_PREFIX
+
+# paths through calls of several functions,
+# whose names are not in sorted order
+LOG = """AutoEPEx: NEW FILE
+AutoEPEx: zeta file0.c:3:1;I0#4@main file0.c:9:1;I0$
+AutoEPEx: zeta file0.c:4:1;I-1#2@main file0.c:10:1;I-1$
+AutoEPEx: alpha file0.c:5:1;I0#6@main file0.c:11:1;I0$
+AutoEPEx: alpha file0.c:6:1;I-1#1@main file0.c:12:1;I-1$
+AutoEPEx: malloc file0.c:7:1;Bfalse#3@main file0.c:13:1;I-1$
+AutoEPEx: malloc file0.c:8:1;Btrue#7@main file0.c:14:1;I0$
+AutoEPEx: mu file0.c:9:1;I1#5@main file0.c:15:1;I0$
+AutoEPEx: mu file0.c:10:1;I0#2@main file0.c:16:1;I-1$
+"""
+
+# Get the prediction rows of the summary of the log.
+# allowlist: the names of the functions to analyze, or None for all functions
+# returns the prediction rows, in the order they were written
+def get_prediction_rows(allowlist):
+	parser = AutoEPExParser(None, StringIO(LOG), allowlist = allowlist, \
+				write_paths = False)
+	parser.read_lines()
+	parse_sum = AutoEPExSum()
+	parse_sum.add(parser)
+	output = StringIO()
+	parse_sum.write_to(output)
+	return filter(lambda line: line.startswith(PREDICTION_PREFIX), \
+		      output.getvalue().split("\n"))
+
+def get_row_function(row):
+	return row[len(PREDICTION_PREFIX) : ].split(",")[0]
+
+print "Writing prediction rows sorted by function"
+ROWS = get_prediction_rows(None)
+FUNCTIONS = map(get_row_function, ROWS)
+if (len(set(FUNCTIONS)) < 4 or FUNCTIONS != sorted(FUNCTIONS)):
+	print "Rows not sorted by function: %s"%(", ".join(FUNCTIONS))
+	exit(-1)
+print "\tPassed!"
+
+print "Writing the same prediction rows for listed functions"
+LISTED = ["zeta", "malloc"]
+LISTED_ROWS = filter(lambda row: get_row_function(row) in LISTED, ROWS)
+FILTERED_ROWS = get_prediction_rows(LISTED)
+if (FILTERED_ROWS != LISTED_ROWS):
+	print "Expected rows:\n%s"%("\n".join(LISTED_ROWS))
+	print "But got rows:\n%s"%("\n".join(FILTERED_ROWS))
+	exit(-1)
+print "\tPassed!"
@@ -1,4 +1,4 @@
-from ranges import RangeNode, RangeList
+from ranges import RangeNode, RangeList, ArrayRangeList
 
 BIG_SINGLE = RangeList([RangeNode(-1024, 1024)])
 SMALL_SINGLE = RangeList([RangeNode(0, 32)])
@@ -214,3 +214,118 @@ TESTS = [RangeTestCase("Adding range to ranges above it", ABOVE_SMALL_SINGLE, \
 
 for test in TESTS:
 	test.perform()
+
+def to_array_list(range_list):
+	return ArrayRangeList(range_list.ranges, range_list.as_list, \
+			      range_list.rest)
+
+ARRAY_TESTS = map(lambda test: RangeTestCase(test.message + ", in arrays", \
+					     to_array_list(test.old), \
+					     to_array_list(test.new), \
+					     to_array_list(test.expected)), \
+		  TESTS)
+
+for test in ARRAY_TESTS:
+	test.perform()
+
+def check_bulk(test):
+	print test.message + ", in bulk"
+	merged = RangeList.merge_all([test.old, test.new])
+	if (not compare_results(test.expected, merged)):
+		print "Merged result not as expected"
+		exit(-1)
+	built = ArrayRangeList.from_many(test.old.ranges + test.new.ranges)
+	if (not compare_results(test.expected, built)):
+		print "Built result not as expected"
+		exit(-1)
+	print "\tPassed!"
+
+for test in TESTS + ARRAY_TESTS:
+	check_bulk(test)
+
+BELOW_FIRST = RangeList([RangeNode(10, 20), RangeNode(30, 40)])
+BELOW_FIRST_QUERIES = RangeList([RangeNode(-5, -1), RangeNode(15, 35), \
+				 RangeNode(38, 50)])
+BELOW_FIRST_OVERLAPS = [(15, 20), (30, 35), (38, 40)]
+
+def overlap_bounds(overlaps):
+	return map(lambda overlap: (overlap[0].least, overlap[0].most), \
+		   overlaps)
+
+def check_below_first(message, range_list, queries):
+	print message
+	for (a, b) in [(range_list, queries), (queries, range_list)]:
+		real_overlaps = overlap_bounds(a.find_overlaps(b))
+		if (real_overlaps != BELOW_FIRST_OVERLAPS):
+			print "Expected overlaps %s, but got %s"% \
+			      (BELOW_FIRST_OVERLAPS, real_overlaps)
+			exit(-1)
+	print "\tPassed!"
+
+check_below_first("Finding overlaps after a range below all others", \
+		  BELOW_FIRST, BELOW_FIRST_QUERIES)
+check_below_first("Finding overlaps after a range below all others, " + \
+		  "in arrays", \
+		  to_array_list(BELOW_FIRST), \
+		  to_array_list(BELOW_FIRST_QUERIES))
+
+# enough copies of the queries that NumPy, if present, searches them
+N_QUERY_COPIES = 64
+
+def get_queries(test):
+	queries = []
+	for range_list in [test.old, test.new, test.expected]:
+		for node in range_list.ranges:
+			queries += [node.clone_top(), \
+				    RangeNode(node.least - 1, node.least - 1), \
+				    RangeNode(node.most + 1, node.most + 1), \
+				    RangeNode(node.least - 1, node.most + 1)]
+	return queries
+
+def check_many(range_list, queries):
+	overlapping = range_list.overlaps_many(queries)
+	expected = map(range_list.overlaps_single, queries)
+	if (overlapping != expected):
+		print "Overlaps of many ranges not as expected"
+		exit(-1)
+	contained = range_list.contains_many(queries + [None])
+	expected = map(range_list.contains, queries + [None])
+	if (contained != expected):
+		print "Containment of many ranges not as expected"
+		exit(-1)
+	coverers = range_list.get_coverers_many(queries + [None])
+	expected = map(lambda query: \
+		       filter(lambda node: node.overlaps(query), \
+			      range_list.ranges), \
+		       queries) + [[None]]
+	if (map(lambda nodes: map(str, nodes), coverers) != \
+	    map(lambda nodes: map(str, nodes), expected)):
+		print "Coverers of many ranges not as expected"
+		exit(-1)
+
+def check_many_queries(test):
+	print test.message + ", with many queries"
+	queries = get_queries(test)
+	for range_list in [test.old, test.new, test.expected]:
+		check_many(range_list, queries)
+		check_many(range_list, queries * N_QUERY_COPIES)
+	print "\tPassed!"
+
+for test in TESTS + ARRAY_TESTS:
+	check_many_queries(test)
+
+def check_queries_after_add(test):
+	print test.message + ", querying before and after adding"
+	queries = get_queries(test)
+	added = test.old.clone_flat()
+	added.overlaps_many(queries)
+	added.add(test.new)
+	check_many(added, queries)
+	if (added.contains_many(queries) != \
+	    test.expected.contains_many(queries)):
+		print "Queries after adding not as expected"
+		exit(-1)
+	print "\tPassed!"
+
+for test in TESTS + ARRAY_TESTS:
+	check_queries_after_add(test)
@@ -0,0 +1,35 @@
+# state that each thread keeps for itself,
+# so that parsers in different threads do not share mutable state
+from threading import local, Lock
+
+# state kept separately by each thread, which the thread can update
+# without locks, and whose totals can still be read from any thread
+# factory: creates the state of a new thread
+# local: holds the state of the current thread
+# states: the states of all the threads
+# lock: guards states
+class PerThreadState:
+	# factory: factory
+	def __init__(self, factory):
+		self.factory = factory
+		self.local = local()
+		self.states = []
+		self.lock = Lock()
+	# Get the state of the current thread, creating it on first use.
+	# returns the state
+	def get(self):
+		state = getattr(self.local, "state", None)
+		if (state is None):
+			state = self.factory()
+			self.local.state = state
+			self.lock.acquire()
+			self.states.append(state)
+			self.lock.release()
+		return state
+	# Get the states of all the threads that have used them.
+	# returns the list of the states
+	def get_all(self):
+		self.lock.acquire()
+		states = list(self.states)
+		self.lock.release()
+		return states
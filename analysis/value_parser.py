@@ -1,7 +1,8 @@
 from ranges import OUT_RANGE_DELIM, OUT_RANGES_DELIM, RangeNode, RangeList
 
-from types import ListType
+from follower_counts import counts_followers
 from sets import Set
+from thread_state import PerThreadState
 
 UNKNOWN_STR = "u"
 
@@ -10,10 +11,12 @@ class ParsedValue:
 		return "."
 	def clone_new_data(self, value):
 		return None
-	def same_assignments(self, other):
-		if (self.symbol_str is None or other.symbol_str is None):
+	def same_symbol(self, symbol_str):
+		if (self.symbol_str is None or symbol_str is None):
 			return False
-		return self.symbol_str == other.symbol_str
+		return self.symbol_str == symbol_str
+	def same_assignments(self, other):
+		return self.same_symbol(other.symbol_str)
 	def listify(self):
 		return self.clone_new_data([self.to_add])
 	def __str__(self):
@@ -22,7 +25,7 @@ class ParsedValue:
 		self.symbol_str = symbol_str
 		self.type_marker = type_marker
 		self.to_add = to_add
-		self.as_list = to_add.__class__ == ListType
+		self.as_list = counts_followers(to_add)
 	def __hash__(self):
 		return hash(str(self))
 	def _overlaps(self, other_key):
@@ -33,10 +36,17 @@ class ParsedValue:
 		if (other_key == UNKNOWN_STR):
 			return True
 		return self._overlaps(other_key)
+	# Check which of some keys overlap this value.
+	# other_keys: the keys
+	# returns the list of the truth of the overlap of each key
+	def overlaps_many(self, other_keys):
+		return map(self.overlaps, other_keys)
 	def get_key(self):
 		return None
 	def have_symbol(self):
 		return (not self.symbol_str is None)
+	def instantiate(self, to_add):
+		return None
 
 VOID_TYPE_START = "V"
 BOOL_TYPE_START = "B"
@@ -54,6 +64,8 @@ class ParsedVoid(ParsedValue):
 				     None, to_add)
 	def clone_new_data(self, data):
 		return ParsedVoid(data)
+	def instantiate(self, to_add):
+		return ParsedVoid(to_add)
 	def value_to_string(self):
 		return ""
 	def _overlaps(self, other_key):
@@ -86,6 +98,8 @@ class ParsedBoolean(ParsedValue):
 		self.boolean = boolean
 	def clone_new_data(self, data):
 		return ParsedBoolean(self.symbol_str, self.boolean, data)
+	def instantiate(self, to_add):
+		return ParsedBoolean(self.symbol_str, self.boolean, to_add)
 	def value_to_string(self):
 		return BOOL_STRS[self.boolean]
 	def _overlaps(self, other_key):
@@ -128,6 +142,8 @@ class ParsedPointer(ParsedValue):
 		self.pointer = pointer
 	def clone_new_data(self, data):
 		return ParsedPointer(self.symbol_str, self.pointer, data)
+	def instantiate(self, to_add):
+		return ParsedPointer(self.symbol_str, self.pointer, to_add)
 	def value_to_string(self):
 		return PTR_STRS[self.pointer]
 	def _overlaps(self, other_key):
@@ -388,7 +404,7 @@ class AssignmentsIntValue(IntValue):
 		return self.main_value == other.main_value
 
 def parse_int(symbol_str, value_str, to_add = 1):
-	as_list = to_add.__class__ == ListType
+	as_list = counts_followers(to_add)
 	assignments_str = None
 	value = None
 	range_value = None
@@ -449,6 +465,14 @@ class ParsedInt(ParsedValue):
 			new_range_value = self.range_value.clone_new_value(data)
 		return ParsedInt(self.symbol_str, self.value, \
 				 new_range_value, data)
+	def instantiate(self, to_add):
+		new_range_value = None
+		if (not self.range_value is None):
+			as_list = counts_followers(to_add)
+			new_range_value = self.range_value.clone_top(to_add, \
+								     as_list)
+		return ParsedInt(self.symbol_str, self.value, \
+				 new_range_value, to_add)
 	def value_to_string(self):
 		if self.range_value is None:
 			return UNRESTRICTED_INT_STR
@@ -472,6 +496,19 @@ class ParsedInt(ParsedValue):
 			return True
 		pre_self_range = str(hash(self.range_value))
 		return self.range_value.overlaps_single(other_key)
+	# Check which of some keys overlap this value,
+	# searching the ranges of all the keys at once.
+	# other_keys: the keys
+	# returns the list of the truth of the overlap of each key
+	def overlaps_many(self, other_keys):
+		if (self.range_value is None):
+			return [True] * len(other_keys)
+		is_range = lambda key: not key is None and key != UNKNOWN_STR
+		range_flags = self.range_value \
+			      .overlaps_many(filter(is_range, other_keys)) \
+			      .__iter__()
+		return map(lambda key: not is_range(key) or range_flags.next(), \
+			   other_keys)
 	def is_exactly(self, value):
 		if (self.range_value is None):
 			return False
@@ -488,12 +525,7 @@ class ParsedInt(ParsedValue):
 
 SYMBOL_PRE = "&"
 
-def parse_value(value_expr, to_add = 1):
-	if (len(value_expr) == 0):
-		return None
-	type_str = value_expr[0]
-
-	untyped_str = value_expr[1 : ]
+def split_symbol(untyped_str):
 	symbol_str = None
 	value_str = None
 	if (len(untyped_str) > 0 and untyped_str[0] == SYMBOL_PRE):
@@ -504,6 +536,22 @@ def parse_value(value_expr, to_add = 1):
 		value_str = untyped_str[val_start : ]
 	else:
 		value_str = untyped_str
+	return symbol_str, value_str
+
+# Get the symbol of a value without parsing the rest of the value.
+# value_expr: the value string
+# returns the symbol_str that the parsed value would have
+def parse_symbol(value_expr):
+	if (len(value_expr) == 0 or value_expr[0] == VOID_TYPE_START):
+		return None
+	return split_symbol(value_expr[1 : ])[0]
+
+def parse_value_uncached(value_expr, to_add = 1):
+	if (len(value_expr) == 0):
+		return None
+	type_str = value_expr[0]
+
+	(symbol_str, value_str) = split_symbol(value_expr[1 : ])
 	data = None
 	if (type_str == VOID_TYPE_START):
 		data = parse_void(to_add)
@@ -517,6 +565,150 @@ def parse_value(value_expr, to_add = 1):
 		return None
 	return type_str, data
 
+# the default maximum number of parsed values in the ValueCache
+DEFAULT_VALUE_CACHE_SIZE = 1 << 14
+
+# the indices of the fields of a ValueCache entry
+ENTRY_PREVIOUS = 0
+ENTRY_NEXT = 1
+ENTRY_KEY = 2
+ENTRY_TYPE = 3
+ENTRY_TEMPLATE = 4
+
+# a bounded cache of parsed values with symbols, keyed by the value strings,
+# which evicts the least recently used value when it is full.
+# The cached values are templates with empty payloads,
+# which are never handed out: each hit gets a new instance
+# with its own payload, and only the template's symbol, value
+# and range bounds are read.
+# The payload only sets the counts, so it is not part of the key.
+# entries: maps value strings to their entries, which are lists of
+#	   the previous and next entries, the value string,
+#	   the type and the parsed template
+# order: the entry before the least recently used entry,
+#	 and after the most recently used entry
+# max_size: the maximum number of templates, or 0 to disable the cache
+# hits: the number of lookups that found a template
+# misses: the number of lookups that had to parse the value
+class ValueCache:
+	# max_size: max_size
+	def __init__(self, max_size = DEFAULT_VALUE_CACHE_SIZE):
+		self.entries = {}
+		self.order = [None, None, None, None, None]
+		self.order[ENTRY_PREVIOUS] = self.order
+		self.order[ENTRY_NEXT] = self.order
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+	# Remove an entry from the usage order.
+	# entry: the entry
+	def _unlink(self, entry):
+		entry[ENTRY_PREVIOUS][ENTRY_NEXT] = entry[ENTRY_NEXT]
+		entry[ENTRY_NEXT][ENTRY_PREVIOUS] = entry[ENTRY_PREVIOUS]
+	# Add an entry to the usage order, as the most recently used.
+	# entry: the entry
+	def _link_last(self, entry):
+		last = self.order[ENTRY_PREVIOUS]
+		entry[ENTRY_PREVIOUS] = last
+		entry[ENTRY_NEXT] = self.order
+		last[ENTRY_NEXT] = entry
+		self.order[ENTRY_PREVIOUS] = entry
+	# Evict the least recently used entry.
+	def _evict(self):
+		first = self.order[ENTRY_NEXT]
+		self._unlink(first)
+		del self.entries[first[ENTRY_KEY]]
+	# Parse a value, or instantiate its cached template.
+	# value_expr: the value string
+	# to_add: the payload of the parsed value
+	# returns the type and parsed value, as in parse_value_uncached
+	def parse(self, value_expr, to_add = 1):
+		if (self.max_size <= 0):
+			self.misses += 1
+			return parse_value_uncached(value_expr, to_add)
+		# Values without symbols are cheaper to parse than to cache.
+		if (value_expr[1 : 1 + len(SYMBOL_PRE)] != SYMBOL_PRE):
+			return parse_value_uncached(value_expr, to_add)
+		entry = self.entries.get(value_expr)
+		if (entry is None):
+			self.misses += 1
+			parsed_pair = parse_value_uncached(value_expr, to_add)
+			if (parsed_pair is None):
+				return None
+			if (len(self.entries) >= self.max_size):
+				self._evict()
+			# The template must not keep the payload alive.
+			(type_str, parsed) = parsed_pair
+			entry = [None, None, value_expr, type_str, \
+				 parsed.instantiate(0)]
+			self.entries[value_expr] = entry
+			self._link_last(entry)
+			return parsed_pair
+		self.hits += 1
+		self._unlink(entry)
+		self._link_last(entry)
+		template = entry[ENTRY_TEMPLATE]
+		return entry[ENTRY_TYPE], template.instantiate(to_add)
+	# Change the maximum number of templates, evicting any extra ones.
+	# max_size: the new max_size
+	def resize(self, max_size):
+		self.max_size = max_size
+		while (len(self.entries) > max(max_size, 0)):
+			self._evict()
+	# Get the lookup counts.
+	# returns the hits and misses
+	def get_counts(self):
+		return (self.hits, self.misses)
+	# Get the lookup counts since earlier counts.
+	# counts: the earlier hits and misses
+	# returns the hits and misses since the earlier counts
+	def counts_since(self, counts):
+		return (self.hits - counts[0], self.misses - counts[1])
+	# Add lookup counts from another cache, eg. in a worker process.
+	# counts: the other cache's hits and misses
+	def add_counts(self, counts):
+		self.hits += counts[0]
+		self.misses += counts[1]
+
+# one ValueCache per thread, so that threads can parse values without locks.
+# It has the same methods as ValueCache, and its counts are the totals
+# of all the threads.
+# max_size: the maximum number of templates in each thread's cache
+# caches: the PerThreadState of the caches
+class ThreadValueCaches:
+	# max_size: max_size
+	def __init__(self, max_size = DEFAULT_VALUE_CACHE_SIZE):
+		self.max_size = max_size
+		self.caches = PerThreadState(lambda: ValueCache(self.max_size))
+	def parse(self, value_expr, to_add = 1):
+		return self.caches.get().parse(value_expr, to_add)
+	# Change the maximum number of templates of every thread's cache.
+	# Other threads should not be parsing values at the time.
+	# max_size: the new max_size
+	def resize(self, max_size):
+		self.max_size = max_size
+		for cache in self.caches.get_all():
+			cache.resize(max_size)
+	def get_counts(self):
+		hits = 0
+		misses = 0
+		for cache in self.caches.get_all():
+			(cache_hits, cache_misses) = cache.get_counts()
+			hits += cache_hits
+			misses += cache_misses
+		return (hits, misses)
+	def counts_since(self, counts):
+		(hits, misses) = self.get_counts()
+		return (hits - counts[0], misses - counts[1])
+	def add_counts(self, counts):
+		self.caches.get().add_counts(counts)
+
+# the caches used by parse_value
+value_caches = ThreadValueCaches()
+
+def parse_value(value_expr, to_add = 1):
+	return value_caches.parse(value_expr, to_add)
+
 def reparse_value(type_str, value_expr, to_add = 1):
 	if (type_str == VOID_TYPE_START):
 		data = reparse_void(to_add)
@@ -5,7 +5,9 @@ from value_parser import BOOL_TYPE_START, PTR_TYPE_START, INT_TYPE_START, \
 			 RangeRightSideValue, UNKNOWN_STR, \
 			 BOOL_TRUE_STR, BOOL_FALSE_STR, \
 			 PTR_NOT_NULL_STR, PTR_NULL_STR
-from ranges import RangeNode, RangeList, RangeBinder, smoothen
+from ranges import RangeNode, RangeList, ArrayRangeList, RangeBinder, \
+		   smoothen, clone_count
+from follower_counts import FollowerCounts
 from error_handler import throw_error
 
 class ValueIter:
@@ -22,19 +24,27 @@ class ValueStat:
 	def __init__(self, type_marker, as_list = False):
 		self.type_marker = type_marker
 		if (as_list):
-			self.total_count = []
+			self.total_count = FollowerCounts()
 		else:
 			self.total_count = 0
 		self.as_list = as_list
-	def typed_update(self, parsed_value):
+	def typed_update(self, parsed_value, to_add):
 		return []
-	def update(self, parsed_value):
+	# Add a value to the statistic.
+	# parsed_value: the parsed value
+	# to_add: the weight of the value, or None for parsed_value.to_add.
+	#	  Passing the weight separately avoids cloning the value
+	#	  with the weight as its new data.
+	# returns the updated counts
+	def update(self, parsed_value, to_add = None):
 		if (self.type_marker != parsed_value.type_marker):
 			throw_error("Expected to add type " + \
 				    "%s, but got %s"%(self.type_marker, \
 						      parsed_value.type_marker))
-		updated_counts = self.typed_update(parsed_value)
-		self.total_count += parsed_value.to_add
+		if (to_add is None):
+			to_add = parsed_value.to_add
+		updated_counts = self.typed_update(parsed_value, to_add)
+		self.total_count += to_add
 		return updated_counts
 	def _gen_unnormalized(self):
 		return ValueStat(self.type_marker)
@@ -65,6 +75,30 @@ class ValueStat:
 		total = self._add(other)
 		total.total_count = self.total_count + other.total_count
 		return total
+	def _add_all(self, others):
+		total = self
+		for other in others:
+			total = total._add(other)
+		return total
+	# Add many statistics of the same type at once,
+	# with the same result as adding them one at a time.
+	# others: the statistics to add to this one, in order
+	# returns the total statistic
+	def add_all(self, others):
+		total = self._add_all(others)
+		total_count = self.total_count
+		for other in others:
+			total_count = total_count + other.total_count
+		total.total_count = total_count
+		return total
+	def _merge(self, other):
+		pass
+	# Add the counts of another statistic of the same type in place,
+	# as if its values had been updated into this one.
+	# other: the other statistic
+	def merge(self, other):
+		self._merge(other)
+		self.total_count += other.total_count
 	def show_data(self):
 		return None
 	def __str__(self):
@@ -169,16 +203,15 @@ class BooleanStat(ValueStat):
 	def __init__(self, as_list = False):
 		ValueStat.__init__(self, BOOL_TYPE_START, as_list)
 		if (as_list):
-			self.true_count = []
-			self.false_count = []
-			self.unknown_count = []
+			self.true_count = FollowerCounts()
+			self.false_count = FollowerCounts()
+			self.unknown_count = FollowerCounts()
 		else:
 			self.true_count = 0
 			self.false_count = 0
 			self.unknown_count = 0
-	def typed_update(self, parsed_value):
+	def typed_update(self, parsed_value, to_add):
 		value = parsed_value.boolean
-		to_add = parsed_value.to_add
 		updated_counts = []
 		if (value & BOOL_UNKNOWN != value):
 			throw_error("Unknown boolean value: %d"%value)
@@ -217,6 +250,10 @@ class BooleanStat(ValueStat):
 		total.unknown_count = self.unknown_count + \
 				      other.unknown_count
 		return total
+	def _merge(self, other):
+		self.true_count += other.true_count
+		self.false_count += other.false_count
+		self.unknown_count += other.unknown_count
 	def __iter__(self):
 		return BooleanIter(self)
 	def has_unknown(self):
@@ -257,16 +294,15 @@ class PointerStat(ValueStat):
 	def __init__(self, as_list = False):
 		ValueStat.__init__(self, PTR_TYPE_START, as_list)
 		if (as_list):
-			self.not_null_count = []
-			self.null_count = []
-			self.unknown_count = []
+			self.not_null_count = FollowerCounts()
+			self.null_count = FollowerCounts()
+			self.unknown_count = FollowerCounts()
 		else:
 			self.not_null_count = 0
 			self.null_count = 0
 			self.unknown_count = 0
-	def typed_update(self, parsed_value):
+	def typed_update(self, parsed_value, to_add):
 		value = parsed_value.pointer
-		to_add = parsed_value.to_add
 		updated_counts = []
 		if (value & PTR_UNKNOWN != value):
 			throw_error("Unknown pointer value: %d"%value)
@@ -308,6 +344,10 @@ class PointerStat(ValueStat):
 		total.unknown_count = self.unknown_count + \
 				      other.unknown_count
 		return total
+	def _merge(self, other):
+		self.not_null_count += other.not_null_count
+		self.null_count += other.null_count
+		self.unknown_count += other.unknown_count
 	def __iter__(self):
 		return PointerIter(self)
 	def has_unknown(self):
@@ -333,26 +373,36 @@ class IntegerIter(ValueIter):
 class IntegerStat(ValueStat):
 	def __init__(self, as_list = False):
 		ValueStat.__init__(self, INT_TYPE_START, as_list)
-		self.range_list = RangeList([], as_list)
-		self.bound_ranges = RangeList([], False, rest = RangeBinder())
+		self.range_list = ArrayRangeList([], as_list)
+		self.bound_ranges = ArrayRangeList([], False, rest = RangeBinder())
+		self.doubled_rest = None
 	def add_range_list(self, new_range_list):
+		# Adding the first ranges also adds the unspecified count again,
+		# so remember how much was added, for merging.
+		if (self.range_list.n_ranges() == 0 and \
+		    new_range_list.n_ranges() > 0):
+			self.doubled_rest = clone_count(self.range_list.rest)
 		self.bound_ranges.add(new_range_list.clone_binder())
 		self.range_list.add(new_range_list)
-	def typed_update(self, parsed_value):
+	def typed_update(self, parsed_value, to_add):
 		int_value = parsed_value.value
-		to_add = parsed_value.to_add
 		updated_counts = []
 		if (int_value == None):
 			parsed_range_value = parsed_value.range_value
 			if (parsed_range_value is None):
 				self.range_list.increment(to_add)
 			else:
+				if (not to_add is parsed_value.to_add):
+					parsed_range_value = \
+					parsed_range_value.clone_new_value(to_add)
 				self.add_range_list(parsed_range_value)
 		elif (int_value.__class__ == LiteralIntValue):
 			value = int_value.value
-			self.add_range_list(RangeList([RangeNode(value, value, \
-								 to_add)], \
-						      self.as_list))
+			# The single new node cannot overlap,
+			# so it does not need to be cloned into the list.
+			literal_list = RangeList([], self.as_list)
+			literal_list.ranges.append(RangeNode(value, value, to_add))
+			self.add_range_list(literal_list)
 		elif (int_value.__class__ == AssignmentsIntValue):
 			right = int_value.main_value.right
 			if (right == None):
@@ -373,7 +423,7 @@ class IntegerStat(ValueStat):
 			throw_error(str(int_value) + \
 				    " is of unknown integer type, " + \
 				    str(int_value.__class__))
-		if (len(self.range_list.ranges) == 0):
+		if (self.range_list.n_ranges() == 0):
 			rest_count = None
 			if (self.range_list.as_list):
 				rest_count = len(self.range_list.rest)
@@ -409,6 +459,31 @@ class IntegerStat(ValueStat):
 		total.range_list = self.range_list.clone_flat()
 		total.range_list.add(other.range_list)
 		return total
+	def _add_all(self, others):
+		total = IntegerStat(self.as_list)
+		range_lists = [self.range_list] + \
+			      map(lambda other: other.range_list, others)
+		total.range_list = ArrayRangeList.merge_all(range_lists, \
+							    self.as_list)
+		return total
+	def _merge(self, other):
+		# Split the other's unspecified count into the parts
+		# before and after its first ranges were added,
+		# and replay the additions in that order.
+		other_rest = other.range_list.rest
+		if (self.as_list):
+			before = FollowerCounts()
+		else:
+			before = 0
+		after = other_rest
+		if (not other.doubled_rest is None):
+			before = other.doubled_rest
+			after = other_rest - (before + before)
+		self.range_list.increment(clone_count(before))
+		if (other.range_list.n_ranges() > 0):
+			self.add_range_list(RangeList(other.range_list.ranges, \
+						      self.as_list))
+		self.range_list.increment(clone_count(after))
 	def __iter__(self):
 		return IntegerIter(self)
 	def short_str(self):
@@ -72,6 +72,19 @@ class ExtremeVote:
 		if (self.top_strength is None or \
 		    used_strength > self.top_strength):
 			self.top_strength = used_strength
+	# Add the votes of another vote with the same settings,
+	# as if they had been tallied after this vote's tallies.
+	# other: the other vote
+	def merge(self, other):
+		self.count += other.count
+		self.tallies += other.tallies
+		self.strengths += other.strengths
+		self.total_strength += other.total_strength
+		self.total_strength_square += other.total_strength_square
+		if (self.top_strength is None or \
+		    (not other.top_strength is None and \
+		     other.top_strength > self.top_strength)):
+			self.top_strength = other.top_strength
 	# Choose the winning votes.
 	# returns a list of the winning votes, or None
 	def _vote(self):